@@ -10,13 +10,20 @@ All models run in a single service with unified endpoints.
 """
 
 import logging
+import math
+from bisect import bisect_left, bisect_right
+from dataclasses import asdict, dataclass, fields
+from functools import lru_cache
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from typing import Dict, Any, List, Optional
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import traceback
 import requests
 import os
+import time
 
 # Try to import yfinance
 try:
@@ -26,16 +33,285 @@ except ImportError:
     YFINANCE_AVAILABLE = False
     logging.warning("yfinance not available")
 
+# Try to import orjson (faster JSON responses; falls back to Flask's stdlib encoder)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 app = Flask(__name__)
+
+if ORJSON_AVAILABLE:
+    class OrjsonProvider(DefaultJSONProvider):
+        """Serialize jsonify() responses with orjson (NumPy-aware; NaN/inf become null)."""
+
+        def _dumps_bytes(self, obj: Any) -> bytes:
+            return orjson.dumps(
+                obj, default=self.default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            )
+
+        def dumps(self, obj: Any, **kwargs: Any) -> str:
+            return self._dumps_bytes(obj).decode()
+
+        def response(self, *args: Any, **kwargs: Any) -> Any:
+            # Hand orjson's bytes straight to the response (no str decode/re-encode round-trip)
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(self._dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+        def loads(self, s: Any, **kwargs: Any) -> Any:
+            return orjson.loads(s)
+
+    app.json = OrjsonProvider(app)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# (epoch seconds, ISO string) of the last timestamp handed out by _iso_now_cached
+_iso_now_cache = (0.0, '')
+
+
+def _iso_now_cached() -> str:
+    """Return datetime.now().isoformat(), refreshed at most once per second.
+    Used for metadata timestamps on hot valuation paths.
+    """
+    global _iso_now_cache
+    now = time.time()
+    if now - _iso_now_cache[0] >= 1.0:
+        _iso_now_cache = (now, datetime.now().isoformat())
+    return _iso_now_cache[1]
+
 # Market constants
 DEFAULT_RISK_FREE_RATE = 0.045  # 10-year Treasury ~4.5%
 DEFAULT_MARKET_RISK_PREMIUM = 0.065  # Historical ERP ~6.5%
 DEFAULT_TAX_RATE = 0.21  # US corporate tax rate
 DEFAULT_TERMINAL_GROWTH = 0.035  # 3.5% long-term GDP+ growth
 
+# Structure-of-arrays layout for the 10-year 3-stage projection
+PROJECTION_DTYPE = np.dtype([
+    ('year', 'i2'),
+    ('stage', 'i1'),
+    ('revenue', 'f8'),
+    ('ebitda', 'f8'),
+    ('ebitda_margin', 'f8'),
+    ('ebit', 'f8'),
+    ('nopat', 'f8'),
+    ('depreciation', 'f8'),
+    ('capex', 'f8'),
+    ('nwc_change', 'f8'),
+    ('free_cash_flow', 'f8'),
+    ('discount_factor', 'f8'),
+    ('pv_fcf', 'f8'),
+    ('growth_rate', 'f8'),
+    ('shares_outstanding', 'f8'),
+    ('total_debt', 'f8')
+])
+
+# Fixed 5 + 5 year horizon: year/stage columns and schedule vectors are built once
+# and shared read-only by every projection
+PROJECTION_YEARS = np.arange(1, 11, dtype=np.float64)
+STAGE_PROGRESS = PROJECTION_YEARS[:5] / 5.0
+# Per-year schedule weights: value = start + (end - start) * weight
+# Growth holds at stage 1 for years 1-5 then fades linearly to the stage 2 ending rate;
+# EBITDA margin ramps linearly to target over years 1-5 then holds
+GROWTH_FADE_WEIGHTS = np.concatenate((np.zeros(5), STAGE_PROGRESS))
+MARGIN_RAMP_WEIGHTS = np.concatenate((STAGE_PROGRESS, np.ones(5)))
+PROJECTION_TEMPLATE = np.zeros(10, dtype=PROJECTION_DTYPE)
+PROJECTION_TEMPLATE['year'] = PROJECTION_YEARS
+PROJECTION_TEMPLATE['stage'] = (1, 1, 1, 1, 1, 2, 2, 2, 2, 2)
+for _horizon_array in (PROJECTION_YEARS, STAGE_PROGRESS, GROWTH_FADE_WEIGHTS, MARGIN_RAMP_WEIGHTS,
+                       PROJECTION_TEMPLATE):
+    _horizon_array.setflags(write=False)
+
+# Raw mock statements by ticker (unknown tickers fall back to AAPL)
+MOCK_FUNDAMENTALS = {
+    'AAPL': {
+        'current_price': 180.0,
+        'shares_outstanding': 15_500_000_000,
+        'market_cap': 2_800_000_000_000,
+        'revenue': 383_000_000_000,
+        'gross_profit': 170_000_000_000,
+        'ebit': 114_000_000_000,
+        'ebitda': 120_000_000_000,
+        'net_income': 97_000_000_000,
+        'operating_cash_flow': 110_000_000_000,
+        'capex': 11_000_000_000,
+        'free_cash_flow': 99_000_000_000,
+        'cash': 50_000_000_000,
+        'total_debt': 100_000_000_000,
+        'equity': 65_000_000_000,
+        'revenue_cagr_3y': 0.08,
+        'revenue_cagr_5y': 0.09,
+        'fcf_cagr_3y': 0.12,
+        'beta': 1.2,
+    }
+}
+
+# Static fields merged into every mock fundamentals snapshot
+MOCK_SNAPSHOT_STATIC = {
+    'sector': 'Technology',
+    'industry': 'Consumer Electronics',
+    'earnings_cagr_3y': 0.12,
+    'roic': 0.25,
+    'roae': 0.45,
+    'asset_turnover': 1.1,
+    'dividends_paid': 15_000_000_000,
+    'share_repurchases': 85_000_000_000,
+    'net_share_issuance': -85_000_000_000,
+    'analyst_count': 45,
+    'analyst_avg_target': 200.0,
+    'data_source': 'mock',
+    'fiscal_year_end': '2023-09-30'
+}
+
+# H-Model sensitivity grid: growth deltas -2%..+2%, WACC deltas -1%..+1%
+SENSITIVITY_GROWTH_DELTAS = np.array([-0.02, -0.01, 0.0, 0.01, 0.02])
+SENSITIVITY_WACC_DELTAS = np.array([-0.01, -0.005, 0.0, 0.005, 0.01])
+
+# 3-Stage sensitivity tables: EBITDA margin target deltas -5%..+5% (revenue growth, WACC and
+# terminal growth reuse the H-Model deltas; WACC is moved through the risk-free rate)
+SENSITIVITY_MARGIN_DELTAS = np.array([-0.05, -0.025, 0.0, 0.025, 0.05])
+
+# Recommendation bands by upside %: a label applies once upside is strictly above its threshold
+RECOMMENDATION_THRESHOLDS = (-15, -5, 10, 20)
+RECOMMENDATION_LABELS = ('STRONG SELL', 'SELL', 'HOLD', 'BUY', 'STRONG BUY')
+
+# Sector-based EBITDA margin targets used for mean reversion (3-Stage)
+SECTOR_MARGIN_TARGETS = {
+    'Technology': 0.30,
+    'Healthcare': 0.20,
+    'Financial Services': 0.25,
+    'Consumer Defensive': 0.15,
+    'Consumer Cyclical': 0.12,
+    'Industrials': 0.15,
+    'Energy': 0.18,
+    'Utilities': 0.22,
+    'Real Estate': 0.35,
+    'Communication Services': 0.25,
+    'Basic Materials': 0.18
+}
+
+# Market-cap size ladder: a cap strictly above THRESHOLDS[i] falls into CATEGORIES[i + 1]
+MARKET_CAP_SIZE_THRESHOLDS = (10e9, 500e9, 1e12, 3e12)
+MARKET_CAP_SIZE_CATEGORIES = ('small-cap', 'mid-cap', 'mid-large', 'large-cap', 'mega-cap')
+
+# Moat-adjusted terminal growth (anything else falls back to 'none')
+MOAT_TERMINAL_GROWTH = {
+    'wide': 0.045,
+    'narrow': 0.038,
+    'none': 0.030
+}
+
+# Economic moat scoring ladders: a value strictly above THRESHOLDS[i] lands in tier i + 1
+MOAT_ROIC_THRESHOLDS = (0.10, 0.15, 0.20)
+MOAT_ROIC_POINTS = (0, 20, 30, 40)
+MOAT_ROIC_FACTORS = (None, 'Good ROIC ({:.1f}%)', 'Strong ROIC ({:.1f}%)', 'Exceptional ROIC ({:.1f}%)')
+MOAT_GROSS_MARGIN_THRESHOLDS = (0.45, 0.60, 0.70)
+MOAT_GROSS_MARGIN_POINTS = (0, 15, 25, 30)
+MOAT_GROSS_MARGIN_FACTORS = (
+    None,
+    'Good margins ({:.1f}%)',
+    'Strong pricing power ({:.1f}% gross margin)',
+    'Premium pricing power ({:.1f}% gross margin)'
+)
+MOAT_FCF_MARGIN_THRESHOLDS = (0.10, 0.15, 0.25)
+MOAT_FCF_MARGIN_POINTS = (0, 10, 15, 20)
+MOAT_FCF_MARGIN_FACTORS = (
+    None,
+    'Solid cash generation ({:.1f}% FCF margin)',
+    'Strong cash generation ({:.1f}% FCF margin)',
+    'Exceptional cash generation ({:.1f}% FCF margin)'
+)
+# Moat category by total score: >= 45 narrow, >= 70 wide
+MOAT_CATEGORY_THRESHOLDS = (45, 70)
+MOAT_CATEGORIES = ('none', 'narrow', 'wide')
+
+# Working capital day heuristics keyed off gross margin
+DEFAULT_WORKING_CAPITAL_DAYS = {'dso': 45.0, 'dio': 60.0, 'dpo': 45.0}
+HIGH_MARGIN_WORKING_CAPITAL_DAYS = {'dso': 40.0, 'dio': 30.0, 'dpo': 50.0}  # gross margin > 60%
+LOW_MARGIN_WORKING_CAPITAL_DAYS = {'dso': 55.0, 'dio': 70.0, 'dpo': 45.0}  # gross margin < 30%
+
+# Sector profiles with typical characteristics used for adjustments
+SECTOR_PROFILES = {
+    'technology': {
+        'category': 'high_growth',
+        'capex_min': 0.03,
+        'dso': 45.0, 'dio': 20.0, 'dpo': 40.0,
+        'exit_multiple_range': (10.0, 20.0),
+        'terminal_growth_cap': 0.045
+    },
+    'healthcare': {
+        'category': 'defensive',
+        'capex_min': 0.04,
+        'dso': 60.0, 'dio': 50.0, 'dpo': 55.0,
+        'exit_multiple_range': (9.0, 14.0),
+        'terminal_growth_cap': 0.04
+    },
+    'consumer defensive': {
+        'category': 'defensive',
+        'capex_min': 0.04,
+        'dso': 35.0, 'dio': 40.0, 'dpo': 45.0,
+        'exit_multiple_range': (8.0, 12.0),
+        'terminal_growth_cap': 0.035
+    },
+    'communication services': {
+        'category': 'mixed',
+        'capex_min': 0.05,
+        'dso': 40.0, 'dio': 25.0, 'dpo': 45.0,
+        'exit_multiple_range': (8.0, 13.0),
+        'terminal_growth_cap': 0.04
+    },
+    'consumer cyclical': {
+        'category': 'cyclical',
+        'capex_min': 0.04,
+        'dso': 40.0, 'dio': 50.0, 'dpo': 50.0,
+        'exit_multiple_range': (7.0, 12.0),
+        'terminal_growth_cap': 0.035
+    },
+    'industrials': {
+        'category': 'cyclical',
+        'capex_min': 0.05,
+        'dso': 45.0, 'dio': 55.0, 'dpo': 50.0,
+        'exit_multiple_range': (7.0, 11.0),
+        'terminal_growth_cap': 0.035
+    },
+    'basic materials': {
+        'category': 'cyclical',
+        'capex_min': 0.06,
+        'dso': 45.0, 'dio': 70.0, 'dpo': 55.0,
+        'exit_multiple_range': (6.0, 10.0),
+        'terminal_growth_cap': 0.03
+    },
+    'energy': {
+        'category': 'cyclical',
+        'capex_min': 0.07,
+        'dso': 35.0, 'dio': 80.0, 'dpo': 60.0,
+        'exit_multiple_range': (4.0, 8.0),
+        'terminal_growth_cap': 0.03
+    },
+    'utilities': {
+        'category': 'regulated',
+        'capex_min': 0.08,
+        'dso': 30.0, 'dio': 30.0, 'dpo': 45.0,
+        'exit_multiple_range': (6.0, 9.0),
+        'terminal_growth_cap': 0.025
+    },
+    'financial services': {
+        'category': 'regulated',
+        'capex_min': 0.02,
+        'dso': 30.0, 'dio': 15.0, 'dpo': 30.0,
+        'exit_multiple_range': (6.0, 10.0),
+        'terminal_growth_cap': 0.03
+    }
+}
+DEFAULT_SECTOR_PROFILE = {
+    'category': 'general',
+    'capex_min': 0.04,
+    'dso': 45.0, 'dio': 60.0, 'dpo': 45.0,
+    'exit_multiple_range': (7.0, 12.0),
+    'terminal_growth_cap': 0.035
+}
+
 
 @app.route('/', methods=['GET'])
 def root():
@@ -50,7 +326,8 @@ def root():
             'fundamentals': '/fundamentals (POST)',
             'dcf': '/dcf (POST) - 3-Stage DCF',
             'hmodel': '/hmodel (POST) - H-Model DCF',
-            'unified': '/unified (POST) - Both models combined'
+            'unified': '/unified (POST) - Both models combined',
+            'sensitivity': '/sensitivity (POST) - 3-Stage DCF sensitivity tables'
         },
         'data_sources': ['yfinance', 'mock'],
         'models': ['3-stage', 'h-model'],
@@ -565,13 +842,7 @@ def run_scenarios():
             'bear': bear_assump
         }
 
-        results = {}
-        for name, assump in scenarios.items():
-            try:
-                results[name] = calculate_3stage_dcf(fundamentals, assump)
-            except Exception as e:
-                logger.error(f"Scenario {name} failed: {e}")
-                results[name] = None
+        results = dict(zip(scenarios, run_dcf_scenarios(fundamentals, list(scenarios.values()))))
 
         # Probability-weighted fair value (ignore missing)
         total_weight = 0.0
@@ -598,6 +869,46 @@ def run_scenarios():
         logger.error(traceback.format_exc())
         return jsonify({'success': False, 'error': str(e)}), 500
 
+
+@app.route('/sensitivity', methods=['POST'])
+def run_sensitivity():
+    """
+    3-Stage DCF sensitivity tables around the base assumptions
+    
+    Request:
+    {
+        "ticker": "AAPL",
+        "fundamentals": {...},  // Optional - will fetch if not provided
+        "assumptions": {...}     // Optional custom assumptions
+    }
+    """
+    try:
+        data = request.json
+        ticker = (data or {}).get('ticker', '').upper()
+        custom = (data or {}).get('assumptions', {})
+
+        if not ticker:
+            return jsonify({'success': False, 'error': 'Ticker required'}), 400
+
+        fundamentals = (data or {}).get('fundamentals')
+        if not fundamentals:
+            fundamentals = fetch_fundamentals_snapshot(ticker)
+
+        assumptions = generate_3stage_assumptions(fundamentals, custom)
+
+        return jsonify({
+            'success': True,
+            'data': {
+                'ticker': ticker,
+                'sensitivities': calculate_3stage_sensitivities(fundamentals, assumptions)
+            },
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        logger.error(f"Sensitivity error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 # ============================================================================
 # FUNDAMENTALS DATA FETCHING (from python-data)
 # ============================================================================
@@ -1068,6 +1379,36 @@ def calculate_working_capital_change_from_days(
     }
 
 
+def delta_nwc_from_days(
+    revenue_current,
+    revenue_prev,
+    cogs_margin: float,
+    dso_days: float,
+    dio_days: float,
+    dpo_days: float
+):
+    """Total ΔNWC from DSO/DIO/DPO; accepts scalars or NumPy arrays of revenues.
+    Mirrors calculate_working_capital_change_from_days without the component breakdown.
+    """
+    cogs_current = np.maximum(0.0, revenue_current * cogs_margin)
+    cogs_prev = np.maximum(0.0, revenue_prev * cogs_margin)
+
+    daily_cogs_curr = cogs_current / 365.0
+    daily_cogs_prev = cogs_prev / 365.0
+
+    delta_ar = dso_days * (revenue_current / 365.0) - dso_days * (revenue_prev / 365.0)
+    delta_inv = dio_days * daily_cogs_curr - dio_days * daily_cogs_prev
+    delta_ap = dpo_days * daily_cogs_curr - dpo_days * daily_cogs_prev
+    return (delta_ar + delta_inv) - delta_ap
+
+
+@lru_cache(maxsize=4096)
+def _wc_delta(revenue_current: float, revenue_prev: float, cogs_margin: float,
+              dso_days: float, dio_days: float, dpo_days: float) -> float:
+    """Memoized scalar ΔNWC (repeat valuations of the same ticker/assumptions hit the cache)."""
+    return float(delta_nwc_from_days(revenue_current, revenue_prev, cogs_margin, dso_days, dio_days, dpo_days))
+
+
 def calculate_terminal_value_exit_multiple(terminal_ebitda: float, exit_multiple: float) -> float:
     """Terminal value via Exit Multiple method (EV/EBITDA)."""
     exit_multiple = max(3.0, min(30.0, float(exit_multiple or 10.0)))
@@ -1086,89 +1427,11 @@ def validate_terminal_growth(terminal_growth: float, wacc: float) -> float:
 def get_sector_profile(sector: str) -> Dict[str, Any]:
     """Return sector profile with typical characteristics used for adjustments."""
     s = (sector or '').lower()
-    profiles = {
-        'technology': {
-            'category': 'high_growth',
-            'capex_min': 0.03,
-            'dso': 45.0, 'dio': 20.0, 'dpo': 40.0,
-            'exit_multiple_range': (10.0, 20.0),
-            'terminal_growth_cap': 0.045
-        },
-        'healthcare': {
-            'category': 'defensive',
-            'capex_min': 0.04,
-            'dso': 60.0, 'dio': 50.0, 'dpo': 55.0,
-            'exit_multiple_range': (9.0, 14.0),
-            'terminal_growth_cap': 0.04
-        },
-        'consumer defensive': {
-            'category': 'defensive',
-            'capex_min': 0.04,
-            'dso': 35.0, 'dio': 40.0, 'dpo': 45.0,
-            'exit_multiple_range': (8.0, 12.0),
-            'terminal_growth_cap': 0.035
-        },
-        'communication services': {
-            'category': 'mixed',
-            'capex_min': 0.05,
-            'dso': 40.0, 'dio': 25.0, 'dpo': 45.0,
-            'exit_multiple_range': (8.0, 13.0),
-            'terminal_growth_cap': 0.04
-        },
-        'consumer cyclical': {
-            'category': 'cyclical',
-            'capex_min': 0.04,
-            'dso': 40.0, 'dio': 50.0, 'dpo': 50.0,
-            'exit_multiple_range': (7.0, 12.0),
-            'terminal_growth_cap': 0.035
-        },
-        'industrials': {
-            'category': 'cyclical',
-            'capex_min': 0.05,
-            'dso': 45.0, 'dio': 55.0, 'dpo': 50.0,
-            'exit_multiple_range': (7.0, 11.0),
-            'terminal_growth_cap': 0.035
-        },
-        'basic materials': {
-            'category': 'cyclical',
-            'capex_min': 0.06,
-            'dso': 45.0, 'dio': 70.0, 'dpo': 55.0,
-            'exit_multiple_range': (6.0, 10.0),
-            'terminal_growth_cap': 0.03
-        },
-        'energy': {
-            'category': 'cyclical',
-            'capex_min': 0.07,
-            'dso': 35.0, 'dio': 80.0, 'dpo': 60.0,
-            'exit_multiple_range': (4.0, 8.0),
-            'terminal_growth_cap': 0.03
-        },
-        'utilities': {
-            'category': 'regulated',
-            'capex_min': 0.08,
-            'dso': 30.0, 'dio': 30.0, 'dpo': 45.0,
-            'exit_multiple_range': (6.0, 9.0),
-            'terminal_growth_cap': 0.025
-        },
-        'financial services': {
-            'category': 'regulated',
-            'capex_min': 0.02,
-            'dso': 30.0, 'dio': 15.0, 'dpo': 30.0,
-            'exit_multiple_range': (6.0, 10.0),
-            'terminal_growth_cap': 0.03
-        }
-    }
-    # Fallback default profile
-    for key, profile in profiles.items():
+    for key, profile in SECTOR_PROFILES.items():
         if key in s:
             return profile
-    return {
-        'category': 'general',
-        'capex_min': 0.04,
-        'dso': 45.0, 'dio': 60.0, 'dpo': 45.0,
-        'exit_multiple_range': (7.0, 12.0),
-        'terminal_growth_cap': 0.035
-    }
+    # Fallback default profile
+    return DEFAULT_SECTOR_PROFILE
 
 
 def apply_industry_adjustments(fundamentals: Dict[str, Any], assumptions: Dict[str, Any]) -> Dict[str, Any]:
@@ -1217,7 +1480,7 @@ def get_exit_multiple_validation(sector: str, chosen_multiple: float) -> Dict[st
               f"Exit multiple {chosen_multiple:.1f}x outside sector range {low:.1f}-{high:.1f}x"
     provenance = {
         'source': 'heuristic_sector_ranges',
-        'vintage': datetime.now().strftime('%Y-%m'),
+        'vintage': _iso_now_cached()[:7],  # YYYY-MM
         'note': 'Replace with external dataset (e.g., Damodaran) for stricter validation.'
     }
     return {'within_range': within, 'range_low': low, 'range_high': high, 'message': message, 'provenance': provenance}
@@ -1257,65 +1520,30 @@ def _safe_get(df: pd.DataFrame, key: str, column: int = 0) -> float:
 
 def get_mock_fundamentals_snapshot(ticker: str) -> Dict[str, Any]:
     """Mock data for testing"""
-    
-    mock_data = {
-        'AAPL': {
-            'current_price': 180.0,
-            'shares_outstanding': 15_500_000_000,
-            'market_cap': 2_800_000_000_000,
-            'revenue': 383_000_000_000,
-            'gross_profit': 170_000_000_000,
-            'ebit': 114_000_000_000,
-            'ebitda': 120_000_000_000,
-            'net_income': 97_000_000_000,
-            'operating_cash_flow': 110_000_000_000,
-            'capex': 11_000_000_000,
-            'free_cash_flow': 99_000_000_000,
-            'cash': 50_000_000_000,
-            'total_debt': 100_000_000_000,
-            'equity': 65_000_000_000,
-            'revenue_cagr_3y': 0.08,
-            'revenue_cagr_5y': 0.09,
-            'fcf_cagr_3y': 0.12,
-            'beta': 1.2,
-        }
-    }
-    
-    base = mock_data.get(ticker, mock_data['AAPL'])
+    # Copy so per-call fields never leak into the shared mock table
+    base = dict(MOCK_FUNDAMENTALS.get(ticker, MOCK_FUNDAMENTALS['AAPL']))
     
     # Calculate derived metrics
+    base.update(MOCK_SNAPSHOT_STATIC)
     base.update({
         'ticker': ticker,
         'company_name': f'{ticker} Inc.',
-        'sector': 'Technology',
-        'industry': 'Consumer Electronics',
         'revenue_by_segment': [],
         'operating_income': base.get('ebit', 0),
         'depreciation_amortization': base['revenue'] * 0.03,
         'short_term_investments': base['cash'] * 0.5,
         'long_term_debt': base['total_debt'] * 0.9,
         'working_capital': base['revenue'] * 0.15,
-        'earnings_cagr_3y': 0.12,
         'gross_margin': base['gross_profit'] / base['revenue'],
         'operating_margin': base['ebit'] / base['revenue'],
         'ebitda_margin': base['ebitda'] / base['revenue'],
         'net_margin': base['net_income'] / base['revenue'],
         'fcf_margin': base['free_cash_flow'] / base['revenue'],
-        'roic': 0.25,
-        'roae': 0.45,
-        'asset_turnover': 1.1,
         'beta_5y': base['beta'],
         'levered_beta': base['beta'],
         'unlevered_beta': base['beta'] * 0.85,
-        'dividends_paid': 15_000_000_000,
-        'share_repurchases': 85_000_000_000,
-        'net_share_issuance': -85_000_000_000,
-        'analyst_count': 45,
-        'analyst_avg_target': 200.0,
         'analyst_ratings': {'buy': 30, 'hold': 12, 'sell': 3},
-        'data_source': 'mock',
-        'fiscal_year_end': '2023-09-30',
-        'last_updated': datetime.now().isoformat()
+        'last_updated': _iso_now_cached()
     })
     
     return base
@@ -1324,61 +1552,40 @@ def get_mock_fundamentals_snapshot(ticker: str) -> Dict[str, Any]:
 def assess_economic_moat(roic: float, gross_margin: float, revenue_cagr_3y: float, fcf_margin: float) -> Dict[str, Any]:
     """Assess economic moat strength based on fundamental metrics"""
     score = 0
-    factors = []
-    
-    # ROIC test (40 points max)
-    if roic > 0.20:
-        score += 40
-        factors.append(f'Exceptional ROIC ({roic*100:.1f}%)')
-    elif roic > 0.15:
-        score += 30
-        factors.append(f'Strong ROIC ({roic*100:.1f}%)')
-    elif roic > 0.10:
-        score += 20
-        factors.append(f'Good ROIC ({roic*100:.1f}%)')
-    
-    # Gross Margin test (30 points max)
-    if gross_margin > 0.70:
-        score += 30
-        factors.append(f'Premium pricing power ({gross_margin*100:.1f}% gross margin)')
-    elif gross_margin > 0.60:
-        score += 25
-        factors.append(f'Strong pricing power ({gross_margin*100:.1f}% gross margin)')
-    elif gross_margin > 0.45:
-        score += 15
-        factors.append(f'Good margins ({gross_margin*100:.1f}%)')
-    
-    # FCF Margin test (20 points max)
-    if fcf_margin > 0.25:
-        score += 20
-        factors.append(f'Exceptional cash generation ({fcf_margin*100:.1f}% FCF margin)')
-    elif fcf_margin > 0.15:
-        score += 15
-        factors.append(f'Strong cash generation ({fcf_margin*100:.1f}% FCF margin)')
-    elif fcf_margin > 0.10:
-        score += 10
-        factors.append(f'Solid cash generation ({fcf_margin*100:.1f}% FCF margin)')
+    # At most one factor per test: fill a fixed-size list and truncate on return
+    factors = [None] * 4
+    n_factors = 0
+    
+    # ROIC (40 points max), Gross Margin (30 points max), FCF Margin (20 points max)
+    # bisect_left counts thresholds strictly below the value, i.e. the tier reached
+    for value, thresholds, points, factor_templates in (
+        (roic, MOAT_ROIC_THRESHOLDS, MOAT_ROIC_POINTS, MOAT_ROIC_FACTORS),
+        (gross_margin, MOAT_GROSS_MARGIN_THRESHOLDS, MOAT_GROSS_MARGIN_POINTS, MOAT_GROSS_MARGIN_FACTORS),
+        (fcf_margin, MOAT_FCF_MARGIN_THRESHOLDS, MOAT_FCF_MARGIN_POINTS, MOAT_FCF_MARGIN_FACTORS)
+    ):
+        tier = bisect_left(thresholds, value)
+        if tier:
+            score += points[tier]
+            factors[n_factors] = factor_templates[tier].format(value * 100)
+            n_factors += 1
     
     # Revenue Growth Stability (10 points max)
     if revenue_cagr_3y > 0.15 and revenue_cagr_3y < 0.30:
         score += 10
-        factors.append(f'Sustainable growth ({revenue_cagr_3y*100:.1f}% CAGR)')
+        factors[n_factors] = f'Sustainable growth ({revenue_cagr_3y*100:.1f}% CAGR)'
+        n_factors += 1
     elif revenue_cagr_3y > 0.08:
         score += 5
-        factors.append(f'Steady growth ({revenue_cagr_3y*100:.1f}% CAGR)')
+        factors[n_factors] = f'Steady growth ({revenue_cagr_3y*100:.1f}% CAGR)'
+        n_factors += 1
     
     # Determine moat category
-    if score >= 70:
-        moat = 'wide'
-    elif score >= 45:
-        moat = 'narrow'
-    else:
-        moat = 'none'
+    moat = MOAT_CATEGORIES[bisect_right(MOAT_CATEGORY_THRESHOLDS, score)]
     
     return {
         'moat': moat,
         'score': score,
-        'factors': factors
+        'factors': factors[:n_factors]
     }
 
 
@@ -1386,9 +1593,52 @@ def assess_economic_moat(roic: float, gross_margin: float, revenue_cagr_3y: floa
 # 3-STAGE DCF MODEL (from python-3stage)
 # ============================================================================
 
+@dataclass(slots=True)
+class DCFAssumptions:
+    """Numeric 3-stage DCF inputs read by the valuation kernel.
+    The full assumptions dict (with transparency metadata) stays the JSON-facing form.
+    """
+    stage1_revenue_growth: float
+    stage2_ending_growth: float
+    terminal_growth: float
+    ebitda_margin_target: float
+    tax_rate: float
+    capex_percent_revenue: float
+    depreciation_percent_revenue: float
+    risk_free_rate: float
+    beta: float
+    market_risk_premium: float
+    cost_of_debt: float
+    # Improved NWC modeling via DSO/DIO/DPO; fall back to simple percent if unavailable
+    use_days_based_nwc: bool = True
+    dso_days: float = 45.0
+    dio_days: float = 60.0
+    dpo_days: float = 45.0
+    nwc_percent_revenue: float = 0.02
+    annual_buyback_rate: float = 0.0
+    annual_debt_paydown_rate: float = 0.0
+    exit_multiple_ev_ebitda: Optional[float] = None
+    terminal_method: str = 'gordon'  # 'gordon' | 'exit_multiple' | 'both'
+    enable_dynamic_wacc: bool = False
+
+
+DCF_ASSUMPTION_FIELDS = tuple(f.name for f in fields(DCFAssumptions))
+# Numeric knobs that calculate_3stage_dcf_batch can sweep per scenario
+DCF_BATCH_FIELDS = tuple(f.name for f in fields(DCFAssumptions) if f.type in (float, Optional[float]))
+
+
+def _as_dc(assumptions) -> DCFAssumptions:
+    """Coerce an assumptions dict (extra keys ignored) into DCFAssumptions."""
+    if isinstance(assumptions, DCFAssumptions):
+        return assumptions
+    return DCFAssumptions(**{k: assumptions[k] for k in DCF_ASSUMPTION_FIELDS if k in assumptions})
+
+
 def calculate_3stage_dcf(fundamentals: Dict[str, Any], assumptions: Dict[str, Any]) -> Dict[str, Any]:
-    """Calculate 3-Stage DCF valuation"""
-    logger.info(f"[3-Stage DCF] Starting calculation for {fundamentals['ticker']}")
+    """Calculate 3-Stage DCF valuation.
+    Accepts an assumptions dict or a DCFAssumptions instance.
+    """
+    logger.info("[3-Stage DCF] Starting calculation for %s", fundamentals['ticker'])
     
     # Extract fundamentals
     revenue = fundamentals['revenue']
@@ -1399,37 +1649,37 @@ def calculate_3stage_dcf(fundamentals: Dict[str, Any], assumptions: Dict[str, An
     total_debt = fundamentals['total_debt']
     
     # Extract assumptions
-    stage1_growth = assumptions['stage1_revenue_growth']
-    stage2_ending_growth = assumptions['stage2_ending_growth']
-    terminal_growth = assumptions['terminal_growth']
-    ebitda_margin_target = assumptions['ebitda_margin_target']
-    tax_rate = assumptions['tax_rate']
-    capex_pct = assumptions['capex_percent_revenue']
-    # Improved NWC modeling via DSO/DIO/DPO; fall back to simple percent if unavailable
-    use_days_based_nwc = assumptions.get('use_days_based_nwc', True)
-    dso_days = assumptions.get('dso_days', 45.0)
-    dio_days = assumptions.get('dio_days', 60.0)
-    dpo_days = assumptions.get('dpo_days', 45.0)
-    nwc_pct = assumptions.get('nwc_percent_revenue', 0.02)
-    da_pct = assumptions['depreciation_percent_revenue']
-    annual_buyback_rate = max(0.0, min(0.1, float(assumptions.get('annual_buyback_rate', 0.0))))
-    annual_debt_paydown_rate = max(0.0, min(0.2, float(assumptions.get('annual_debt_paydown_rate', 0.0))))
-    exit_multiple = assumptions.get('exit_multiple_ev_ebitda')
-    terminal_method = assumptions.get('terminal_method', 'gordon')  # 'gordon' | 'exit_multiple' | 'both'
+    params = _as_dc(assumptions)
+    stage1_growth = params.stage1_revenue_growth
+    stage2_ending_growth = params.stage2_ending_growth
+    terminal_growth = params.terminal_growth
+    ebitda_margin_target = params.ebitda_margin_target
+    tax_rate = params.tax_rate
+    capex_pct = params.capex_percent_revenue
+    use_days_based_nwc = params.use_days_based_nwc
+    dso_days = params.dso_days
+    dio_days = params.dio_days
+    dpo_days = params.dpo_days
+    nwc_pct = params.nwc_percent_revenue
+    da_pct = params.depreciation_percent_revenue
+    annual_buyback_rate = max(0.0, min(0.1, float(params.annual_buyback_rate)))
+    annual_debt_paydown_rate = max(0.0, min(0.2, float(params.annual_debt_paydown_rate)))
+    exit_multiple = params.exit_multiple_ev_ebitda
+    terminal_method = params.terminal_method
     
     # Calculate WACC
     wacc_static = calculate_wacc(
-        risk_free_rate=assumptions['risk_free_rate'],
-        beta=assumptions['beta'],
-        market_risk_premium=assumptions['market_risk_premium'],
-        cost_of_debt=assumptions['cost_of_debt'],
+        risk_free_rate=params.risk_free_rate,
+        beta=params.beta,
+        market_risk_premium=params.market_risk_premium,
+        cost_of_debt=params.cost_of_debt,
         market_value_equity=current_price * shares_outstanding,
         market_value_debt=total_debt,
         tax_rate=tax_rate
     )
     wacc = maybe_calculate_dynamic_wacc(
         base_wacc=wacc_static,
-        assumptions=assumptions,
+        assumptions=params,
         market_value_equity=current_price * shares_outstanding,
         market_value_debt=total_debt
     )
@@ -1437,165 +1687,76 @@ def calculate_3stage_dcf(fundamentals: Dict[str, Any], assumptions: Dict[str, An
     # Validate terminal growth < WACC
     validated_terminal_growth = validate_terminal_growth(terminal_growth, wacc)
     if abs(validated_terminal_growth - terminal_growth) > 1e-9:
-        logger.warning(f"Terminal growth {terminal_growth:.2%} adjusted to {validated_terminal_growth:.2%} vs WACC {wacc:.2%}")
+        logger.warning("Terminal growth %.2f%% adjusted to %.2f%% vs WACC %.2f%%",
+                       terminal_growth * 100, validated_terminal_growth * 100, wacc * 100)
         terminal_growth = validated_terminal_growth
-        assumptions['terminal_growth'] = terminal_growth
+        params.terminal_growth = terminal_growth
+        if isinstance(assumptions, dict):
+            assumptions['terminal_growth'] = terminal_growth
     
-    # === STAGE 1: High Growth (Years 1-5) ===
-    projections = []
-    current_revenue = revenue
+    # === STAGES 1-2: High Growth (Years 1-5) + Transition (Years 6-10) ===
+    # Both stages share one projection body driven by per-year growth/margin schedules
     cogs_margin = max(0.0, min(0.95, 1.0 - fundamentals.get('gross_margin', 0.4)))
-    current_shares = shares_outstanding
-    current_debt = total_debt
-    
-    for year in range(1, 6):
-        # Revenue projection - use constant Stage 1 growth
-        # (H-Model handles decay naturally, 3-Stage uses explicit stages)
-        projected_revenue = current_revenue * ((1 + stage1_growth) ** year)
-        
-        # EBITDA (linear margin expansion to target)
-        margin_progress = year / 5.0
-        ebitda_margin = ebitda_margin_current + (ebitda_margin_target - ebitda_margin_current) * margin_progress
-        ebitda = projected_revenue * ebitda_margin
-        
-        # Depreciation & Amortization
-        depreciation = projected_revenue * da_pct
-        
-        # EBIT = EBITDA - D&A
-        ebit = ebitda - depreciation
-        
-        # NOPAT = EBIT * (1 - tax_rate)
-        nopat = ebit * (1 - tax_rate)
-        
-        # CapEx
-        capex = projected_revenue * capex_pct
-        
-        # Change in NWC (days-based preferred)
-        prior_year_revenue = current_revenue * ((1 + stage1_growth) ** (year - 1))
-        if use_days_based_nwc:
-            wc = calculate_working_capital_change_from_days(
-                revenue_current=projected_revenue,
-                revenue_prev=prior_year_revenue,
-                cogs_margin=cogs_margin,
-                dso_days=dso_days,
-                dio_days=dio_days,
-                dpo_days=dpo_days
-            )
-            nwc_change = wc['delta_nwc']
-        else:
-            revenue_change = projected_revenue - prior_year_revenue
-            nwc_change = revenue_change * nwc_pct
-        
-        # Free Cash Flow = NOPAT + D&A - CapEx - ΔNWC
-        fcf = nopat + depreciation - capex - nwc_change
-        
-        # Discount to present value
-        discount_factor = (1 + wacc) ** year
-        pv_fcf = fcf / discount_factor
-        
-        # Shares buyback impact (reduce shares outstanding)
-        current_shares = current_shares * (1.0 - annual_buyback_rate)
-
-        # Debt paydown (reduce outstanding debt)
-        current_debt = current_debt * (1.0 - annual_debt_paydown_rate)
-
-        projections.append({
-            'year': year,
-            'stage': 1,
-            'revenue': projected_revenue,
-            'ebitda': ebitda,
-            'ebitda_margin': ebitda_margin,
-            'ebit': ebit,
-            'nopat': nopat,
-            'depreciation': depreciation,
-            'capex': capex,
-            'nwc_change': nwc_change,
-            'free_cash_flow': fcf,
-            'discount_factor': discount_factor,
-            'pv_fcf': pv_fcf,
-            'shares_outstanding': current_shares,
-            'total_debt': current_debt
-        })
     
-    # === STAGE 2: Transition (Years 6-10) ===
-    year_5_revenue = projections[4]['revenue']
+    # Revenue growth: constant in Stage 1 (H-Model handles decay naturally,
+    # 3-Stage uses explicit stages), linear fade to stage2_ending_growth in Stage 2
+    growth = stage1_growth + (stage2_ending_growth - stage1_growth) * GROWTH_FADE_WEIGHTS
     
-    for year in range(6, 11):
-        year_in_stage2 = year - 5
-        growth_decline_progress = year_in_stage2 / 5.0
-        current_growth = stage1_growth - (stage1_growth - stage2_ending_growth) * growth_decline_progress
-        
-        # Revenue projection
-        if year == 6:
-            projected_revenue = year_5_revenue * (1 + current_growth)
-        else:
-            prior_year_revenue = projections[year - 2]['revenue']
-            projected_revenue = prior_year_revenue * (1 + current_growth)
-        
-        # EBITDA margin stabilizes at target
-        ebitda_margin = ebitda_margin_target
-        ebitda = projected_revenue * ebitda_margin
-        
-        # Depreciation & Amortization
-        depreciation = projected_revenue * da_pct
-        
-        # EBIT
-        ebit = ebitda - depreciation
-        
-        # NOPAT
-        nopat = ebit * (1 - tax_rate)
-        
-        # CapEx
-        capex = projected_revenue * capex_pct
-        
-        # Change in NWC
-        prior_revenue = projections[year - 2]['revenue']
-        if use_days_based_nwc:
-            wc = calculate_working_capital_change_from_days(
-                revenue_current=projected_revenue,
-                revenue_prev=prior_revenue,
-                cogs_margin=cogs_margin,
-                dso_days=dso_days,
-                dio_days=dio_days,
-                dpo_days=dpo_days
-            )
-            nwc_change = wc['delta_nwc']
-        else:
-            revenue_change = projected_revenue - prior_revenue
-            nwc_change = revenue_change * nwc_pct
-        
-        # Free Cash Flow
-        fcf = nopat + depreciation - capex - nwc_change
-        
-        # Discount to present value
-        discount_factor = (1 + wacc) ** year
-        pv_fcf = fcf / discount_factor
-        
-        # Shares buyback and debt paydown continue
-        current_shares = current_shares * (1.0 - annual_buyback_rate)
-        current_debt = current_debt * (1.0 - annual_debt_paydown_rate)
-
-        projections.append({
-            'year': year,
-            'stage': 2,
-            'revenue': projected_revenue,
-            'ebitda': ebitda,
-            'ebitda_margin': ebitda_margin,
-            'ebit': ebit,
-            'nopat': nopat,
-            'depreciation': depreciation,
-            'capex': capex,
-            'nwc_change': nwc_change,
-            'free_cash_flow': fcf,
-            'discount_factor': discount_factor,
-            'pv_fcf': pv_fcf,
-            'growth_rate': current_growth,
-            'shares_outstanding': current_shares,
-            'total_debt': current_debt
-        })
+    # EBITDA margin: linear expansion to target in Stage 1, stable at target in Stage 2
+    ebitda_margin = ebitda_margin_current + (ebitda_margin_target - ebitda_margin_current) * MARGIN_RAMP_WEIGHTS
+    
+    # Left-to-right running products: revenue[0] is the base year, revenue[k] year k
+    revenue_path = np.cumprod(np.concatenate(([revenue], 1.0 + growth)))
+    projected_revenue = revenue_path[1:]
+    prior_year_revenue = revenue_path[:-1]
+    
+    ebitda = projected_revenue * ebitda_margin
+    depreciation = projected_revenue * da_pct
+    ebit = ebitda - depreciation
+    nopat = ebit * (1 - tax_rate)
+    capex = projected_revenue * capex_pct
+    
+    # Change in NWC (days-based preferred)
+    if use_days_based_nwc:
+        nwc_change = delta_nwc_from_days(
+            projected_revenue, prior_year_revenue, cogs_margin, dso_days, dio_days, dpo_days
+        )
+    else:
+        nwc_change = (projected_revenue - prior_year_revenue) * nwc_pct
+    
+    # Free Cash Flow = NOPAT + D&A - CapEx - ΔNWC
+    fcf = nopat + depreciation - capex - nwc_change
+    
+    # Discount to present value: (1 + wacc) ** year as exp(year * log1p(wacc)),
+    # one log1p for the whole horizon and stable for small rates
+    log1p_wacc = math.log1p(wacc)
+    discount_factors = np.exp(PROJECTION_YEARS * log1p_wacc)
+    pv_fcf = fcf / discount_factors
+    
+    # Shares buyback and debt paydown compound each year
+    shares_path = np.cumprod(np.concatenate(([shares_outstanding], np.full(10, 1.0 - annual_buyback_rate))))[1:]
+    debt_path = np.cumprod(np.concatenate(([total_debt], np.full(10, 1.0 - annual_debt_paydown_rate))))[1:]
+    current_shares = float(shares_path[-1])
+    current_debt = float(debt_path[-1])
+    
+    projections = PROJECTION_TEMPLATE.copy()
+    projections['revenue'] = projected_revenue
+    projections['ebitda'] = ebitda
+    projections['ebitda_margin'] = ebitda_margin
+    projections['ebit'] = ebit
+    projections['nopat'] = nopat
+    projections['depreciation'] = depreciation
+    projections['capex'] = capex
+    projections['nwc_change'] = nwc_change
+    projections['free_cash_flow'] = fcf
+    projections['discount_factor'] = discount_factors
+    projections['pv_fcf'] = pv_fcf
+    projections['growth_rate'] = growth
+    projections['shares_outstanding'] = shares_path
+    projections['total_debt'] = debt_path
     
     # === STAGE 3: Terminal Value (Perpetuity) ===
-    year_10_revenue = projections[9]['revenue']
+    year_10_revenue = float(revenue_path[-1])
     year_11_revenue = year_10_revenue * (1 + terminal_growth)
     
     # Terminal year FCF
@@ -1605,51 +1766,42 @@ def calculate_3stage_dcf(fundamentals: Dict[str, Any], assumptions: Dict[str, An
     terminal_nopat = terminal_ebit * (1 - tax_rate)
     terminal_capex = year_11_revenue * capex_pct
     if use_days_based_nwc:
-        wc_terminal = calculate_working_capital_change_from_days(
-            revenue_current=year_11_revenue,
-            revenue_prev=year_10_revenue,
-            cogs_margin=cogs_margin,
-            dso_days=dso_days,
-            dio_days=dio_days,
-            dpo_days=dpo_days
-        )
-        terminal_nwc_change = wc_terminal['delta_nwc']
+        terminal_nwc_change = _wc_delta(year_11_revenue, year_10_revenue, cogs_margin,
+                                        dso_days, dio_days, dpo_days)
     else:
         terminal_nwc_change = (year_11_revenue - year_10_revenue) * nwc_pct
     terminal_fcf = terminal_nopat + terminal_depreciation - terminal_capex - terminal_nwc_change
     
     # HANDLE NEGATIVE TERMINAL FCF: Use conservative floor
     if terminal_fcf <= 0:
-        logger.warning(f"[3-Stage DCF] Negative terminal FCF ${terminal_fcf/1e6:.1f}M - using revenue-based floor")
+        logger.warning("[3-Stage DCF] Negative terminal FCF $%.1fM - using revenue-based floor", terminal_fcf / 1e6)
         terminal_fcf = year_11_revenue * 0.05  # 5% of revenue as conservative floor
-        logger.info(f"[3-Stage DCF] Using terminal FCF floor: ${terminal_fcf/1e6:.1f}M")
+        logger.info("[3-Stage DCF] Using terminal FCF floor: $%.1fM", terminal_fcf / 1e6)
     
     # Terminal Value methods
     tv_gordon = terminal_fcf / (wacc - terminal_growth)
-    tv_exit_multiple = None
     if terminal_method in ('exit_multiple', 'both'):
         tv_exit_multiple = calculate_terminal_value_exit_multiple(terminal_ebitda, exit_multiple or 10.0)
-    # Validate chosen exit multiple vs sector norms
-    exit_multiple_validation = None
-    if tv_exit_multiple is not None:
+        # Validate chosen exit multiple vs sector norms
         exit_multiple_validation = get_exit_multiple_validation(
             fundamentals.get('sector', ''), float(exit_multiple or 10.0)
         )
-    if terminal_method == 'gordon':
-        terminal_value = tv_gordon
-    elif terminal_method == 'exit_multiple':
-        terminal_value = tv_exit_multiple if tv_exit_multiple is not None else tv_gordon
-    else:  # both -> average for headline, include details
-        if tv_exit_multiple is None:
-            terminal_value = tv_gordon
-        else:
+        if terminal_method == 'exit_multiple':
+            terminal_value = tv_exit_multiple
+        else:  # both -> average for headline, include details
             terminal_value = (tv_gordon + tv_exit_multiple) / 2.0
+    else:
+        # Gordon fast path: exit-multiple value and sector validation are never used
+        tv_exit_multiple = None
+        exit_multiple_validation = None
+        terminal_value = tv_gordon
     
     # Discount terminal value to present (Year 0)
-    pv_terminal_value = terminal_value / ((1 + wacc) ** 10)
+    # Terminal value is discounted from year 10 (reuse the year-10 factor)
+    pv_terminal_value = terminal_value / float(discount_factors[-1])
     
     # === ENTERPRISE VALUE ===
-    sum_pv_fcf = sum(p['pv_fcf'] for p in projections)
+    sum_pv_fcf = float(projections['pv_fcf'].sum())
     enterprise_value = sum_pv_fcf + pv_terminal_value
     
     # Terminal value as % of EV
@@ -1658,8 +1810,8 @@ def calculate_3stage_dcf(fundamentals: Dict[str, Any], assumptions: Dict[str, An
     
     # PROFESSIONAL STANDARD: Terminal value haircut if too dominant
     if terminal_value_percent > 0.80:
-        logger.warning(f"[Terminal Value Check] Terminal value {terminal_value_percent:.1%} of EV is too high (>80%)")
-        logger.warning(f"[Terminal Value Check] Applying 20% haircut to terminal value for conservatism")
+        logger.warning("[Terminal Value Check] Terminal value %.1f%% of EV is too high (>80%%)", terminal_value_percent * 100)
+        logger.warning("[Terminal Value Check] Applying 20% haircut to terminal value for conservatism")
         pv_terminal_value *= 0.80
         enterprise_value = sum_pv_fcf + pv_terminal_value
         terminal_value_percent = pv_terminal_value / enterprise_value if enterprise_value > 0 else 0
@@ -1684,15 +1836,18 @@ def calculate_3stage_dcf(fundamentals: Dict[str, Any], assumptions: Dict[str, An
     max_reasonable_market_cap = 5_000_000_000_000  # $5T is absolute maximum
     
     if implied_market_cap > max_reasonable_market_cap:
-        logger.warning(f"[Market Cap Check] Implied market cap ${implied_market_cap/1e12:.2f}T exceeds reasonable maximum ${max_reasonable_market_cap/1e12:.1f}T")
+        logger.warning("[Market Cap Check] Implied market cap $%.2fT exceeds reasonable maximum $%.1fT",
+                       implied_market_cap / 1e12, max_reasonable_market_cap / 1e12)
         scale_factor = max_reasonable_market_cap / implied_market_cap
         price_per_share *= scale_factor
-        logger.warning(f"[Market Cap Check] Scaling down fair value by {(1-scale_factor)*100:.1f}% to ${price_per_share:.2f}")
+        logger.warning("[Market Cap Check] Scaling down fair value by %.1f%% to $%.2f",
+                       (1 - scale_factor) * 100, price_per_share)
     
     # Upside/Downside
     upside_downside = ((price_per_share - current_price) / current_price) * 100 if current_price > 0 else 0
     
-    logger.info(f"[3-Stage DCF] Fair value: ${price_per_share:.2f}, Current: ${current_price:.2f}, Upside: {upside_downside:.1%}")
+    logger.info("[3-Stage DCF] Fair value: $%.2f, Current: $%.2f, Upside: %.1f%%",
+                price_per_share, current_price, upside_downside)
     
     return {
         'model': '3stage',
@@ -1709,7 +1864,7 @@ def calculate_3stage_dcf(fundamentals: Dict[str, Any], assumptions: Dict[str, An
         'terminal_value_percent': terminal_value_percent,
         'terminal_fcf': terminal_fcf,
         'sum_pv_fcf_10y': sum_pv_fcf,
-        'projections': projections,
+        'projections': projections_to_dicts(projections),
         'terminal_year': {
             'year': 11,
             'revenue': year_11_revenue,
@@ -1719,7 +1874,7 @@ def calculate_3stage_dcf(fundamentals: Dict[str, Any], assumptions: Dict[str, An
             'fcf': terminal_fcf,
             'growth_rate': terminal_growth
         },
-        'assumptions': assumptions,
+        'assumptions': assumptions if isinstance(assumptions, dict) else asdict(params),
         'terminal_methods': {
             'gordon_growth': tv_gordon,
             'exit_multiple': tv_exit_multiple,
@@ -1729,8 +1884,235 @@ def calculate_3stage_dcf(fundamentals: Dict[str, Any], assumptions: Dict[str, An
         'warnings': {
             'terminal_dominance': terminal_dominance_warning
         },
-        'calculation_date': datetime.now().isoformat()
+        'calculation_date': _iso_now_cached()
+    }
+
+
+def _calculate_3stage_dcf_or_none(fundamentals: Dict[str, Any], assumptions: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Run a single 3-stage DCF, returning None instead of raising (one scenario)."""
+    try:
+        return calculate_3stage_dcf(fundamentals, assumptions)
+    except Exception as e:
+        logger.error("Scenario DCF failed for %s: %s", fundamentals.get('ticker'), e)
+        return None
+
+
+def run_dcf_scenarios(fundamentals: Dict[str, Any],
+                      assumption_variants: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Run the 3-stage DCF once per assumption variant, preserving input order.
+    
+    Failed variants come back as None. Use this only when every variant's
+    full result is needed; sweeps that only need headline numbers
+    (sensitivity tables, tornado charts, Monte Carlo) should use
+    calculate_3stage_dcf_batch.
+    """
+    return [_calculate_3stage_dcf_or_none(fundamentals, a) for a in assumption_variants]
+
+
+def calculate_3stage_dcf_batch(fundamentals: Dict[str, Any], assumptions_grid: Dict[str, Any],
+                               base_assumptions: Optional[Dict[str, Any]] = None) -> Dict[str, np.ndarray]:
+    """
+    Vectorized 3-stage DCF over N scenarios for a single company.
+    
+    assumptions_grid maps DCF_BATCH_FIELDS names to length-N arrays (or scalars);
+    anything not swept comes from base_assumptions (generated when omitted).
+    Fundamentals-derived constants are computed once and every scenario runs
+    through the same (N, 10) projection. Returns per-scenario headline arrays
+    matching calculate_3stage_dcf (sensitivity tables, tornado charts).
+    """
+    unknown = set(assumptions_grid) - set(DCF_BATCH_FIELDS)
+    if unknown:
+        raise ValueError(f"Unsupported batch assumption fields: {sorted(unknown)}")
+    params = _as_dc(base_assumptions or generate_3stage_assumptions(fundamentals))
+    
+    # Fundamentals-derived constants, shared by every scenario
+    revenue = fundamentals['revenue']
+    ebitda_margin_current = fundamentals['ebitda_margin']
+    current_price = fundamentals['current_price']
+    shares_outstanding = fundamentals['shares_outstanding']
+    cash = fundamentals['cash']
+    total_debt = fundamentals['total_debt']
+    cogs_margin = max(0.0, min(0.95, 1.0 - fundamentals.get('gross_margin', 0.4)))
+    market_value_equity = current_price * shares_outstanding
+    total_value = market_value_equity + total_debt
+    
+    # One (N, 1) column per assumption so scenario knobs broadcast across the horizon
+    names = DCF_BATCH_FIELDS
+    swept = [assumptions_grid.get(name, getattr(params, name)) for name in names]
+    swept = [10.0 if value is None else value for value in swept]
+    columns = dict(zip(names, (c.reshape(-1, 1) for c in np.broadcast_arrays(*np.atleast_1d(*swept)))))
+    
+    # WACC (CAPM, same caps as calculate_wacc)
+    cost_of_equity = columns['risk_free_rate'] + columns['beta'] * columns['market_risk_premium']
+    if total_value == 0:
+        wacc = cost_of_equity
+    else:
+        after_tax_cost_of_debt = columns['cost_of_debt'] * (1.0 - columns['tax_rate'])
+        wacc = np.clip(
+            (market_value_equity * cost_of_equity + total_debt * after_tax_cost_of_debt) / total_value,
+            0.05, 0.25
+        )
+        if params.enable_dynamic_wacc and total_value > 0:
+            wacc = np.maximum(0.0, wacc + (total_debt / total_value - 0.30) * 0.01)
+    
+    # Terminal growth < WACC (same rules as validate_terminal_growth)
+    terminal_growth = columns['terminal_growth']
+    bounded_growth = np.clip(terminal_growth, 0.0, 0.08)
+    terminal_growth = np.where((wacc > 0) & (terminal_growth >= wacc), wacc * 0.7, bounded_growth)
+    
+    # Stages 1-2 growth and margin schedules, shape (N, 10)
+    stage1_growth = columns['stage1_revenue_growth']
+    n_scenarios = stage1_growth.shape[0]
+    growth = stage1_growth + (columns['stage2_ending_growth'] - stage1_growth) * GROWTH_FADE_WEIGHTS
+    margin_target = columns['ebitda_margin_target']
+    ebitda_margin = ebitda_margin_current + (margin_target - ebitda_margin_current) * MARGIN_RAMP_WEIGHTS
+    
+    revenue_path = np.cumprod(np.hstack((np.full((n_scenarios, 1), float(revenue)), 1.0 + growth)), axis=1)
+    projected_revenue = revenue_path[:, 1:]
+    prior_year_revenue = revenue_path[:, :-1]
+    
+    tax_rate = columns['tax_rate']
+    da_pct = columns['depreciation_percent_revenue']
+    capex_pct = columns['capex_percent_revenue']
+    dso_days, dio_days, dpo_days = columns['dso_days'], columns['dio_days'], columns['dpo_days']
+    
+    depreciation = projected_revenue * da_pct
+    nopat = (projected_revenue * ebitda_margin - depreciation) * (1 - tax_rate)
+    if params.use_days_based_nwc:
+        nwc_change = delta_nwc_from_days(projected_revenue, prior_year_revenue, cogs_margin,
+                                         dso_days, dio_days, dpo_days)
+    else:
+        nwc_change = (projected_revenue - prior_year_revenue) * columns['nwc_percent_revenue']
+    fcf = nopat + depreciation - projected_revenue * capex_pct - nwc_change
+    
+    discount_factors = np.exp(PROJECTION_YEARS * np.log1p(wacc))
+    sum_pv_fcf = (fcf / discount_factors).sum(axis=1)
+    
+    # Stage 3: terminal year off year-10 revenue
+    year_10_revenue = revenue_path[:, -1:]
+    year_11_revenue = year_10_revenue * (1 + terminal_growth)
+    terminal_ebitda = year_11_revenue * margin_target
+    terminal_depreciation = year_11_revenue * da_pct
+    if params.use_days_based_nwc:
+        terminal_nwc_change = delta_nwc_from_days(year_11_revenue, year_10_revenue, cogs_margin,
+                                                  dso_days, dio_days, dpo_days)
+    else:
+        terminal_nwc_change = (year_11_revenue - year_10_revenue) * columns['nwc_percent_revenue']
+    terminal_fcf = ((terminal_ebitda - terminal_depreciation) * (1 - tax_rate) + terminal_depreciation
+                    - year_11_revenue * capex_pct - terminal_nwc_change)
+    terminal_fcf = np.where(terminal_fcf <= 0, year_11_revenue * 0.05, terminal_fcf)
+    
+    tv_gordon = terminal_fcf / (wacc - terminal_growth)
+    if params.terminal_method in ('exit_multiple', 'both'):
+        tv_exit_multiple = terminal_ebitda * np.clip(columns['exit_multiple_ev_ebitda'], 3.0, 30.0)
+        if params.terminal_method == 'exit_multiple':
+            terminal_value = tv_exit_multiple
+        else:
+            terminal_value = (tv_gordon + tv_exit_multiple) / 2.0
+    else:
+        terminal_value = tv_gordon
+    pv_terminal_value = terminal_value / discount_factors[:, -1:]
+    
+    # Terminal value haircut when >80% of EV
+    pv_terminal_value, sum_pv_fcf = pv_terminal_value.ravel(), sum_pv_fcf.ravel()
+    enterprise_value = sum_pv_fcf + pv_terminal_value
+    dominant = (enterprise_value > 0) & (pv_terminal_value > 0.80 * enterprise_value)
+    pv_terminal_value = np.where(dominant, pv_terminal_value * 0.80, pv_terminal_value)
+    enterprise_value = sum_pv_fcf + pv_terminal_value
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terminal_value_percent = np.where(enterprise_value > 0, pv_terminal_value / enterprise_value, 0.0)
+    
+    # Equity value per share after 10 years of buybacks and debt paydown
+    buyback_rate = np.clip(columns['annual_buyback_rate'], 0.0, 0.1).ravel()
+    paydown_rate = np.clip(columns['annual_debt_paydown_rate'], 0.0, 0.2).ravel()
+    final_shares = np.maximum(1.0, shares_outstanding * np.exp(10.0 * np.log1p(-buyback_rate)))
+    final_debt = total_debt * np.exp(10.0 * np.log1p(-paydown_rate))
+    equity_value = enterprise_value - (final_debt - cash)
+    price_per_share = equity_value / final_shares
+    
+    # Market cap reality check ($5T ceiling)
+    implied_market_cap = price_per_share * final_shares
+    price_per_share = np.where(implied_market_cap > 5_000_000_000_000,
+                               price_per_share * (5_000_000_000_000 / implied_market_cap), price_per_share)
+    upside_downside = ((price_per_share - current_price) / current_price) * 100 if current_price > 0 \
+        else np.zeros_like(price_per_share)
+    
+    return {
+        'price_per_share': price_per_share,
+        'upside_downside': upside_downside,
+        'enterprise_value': enterprise_value,
+        'equity_value': equity_value,
+        'sum_pv_fcf': sum_pv_fcf,
+        'pv_terminal_value': pv_terminal_value,
+        'terminal_value_percent': terminal_value_percent,
+        'wacc': wacc.ravel(),
+        'terminal_growth': terminal_growth.ravel()
+    }
+
+
+def calculate_3stage_sensitivities(fundamentals: Dict[str, Any], assumptions: Dict[str, Any]) -> Dict[str, list]:
+    """
+    One-way (revenue growth, EBITDA margin, WACC, terminal growth) and two-way
+    (revenue growth x EBITDA margin) 3-stage DCF sensitivity tables.
+    
+    All 45 scenarios go through a single calculate_3stage_dcf_batch call. WACC
+    is shifted via the risk-free rate, so its rows report the WACC the model
+    actually used (after capital-structure weighting and caps); terminal growth
+    rows likewise report the validated rate.
+    """
+    n = len(SENSITIVITY_GROWTH_DELTAS)
+    growth = assumptions['stage1_revenue_growth'] + SENSITIVITY_GROWTH_DELTAS
+    margin = assumptions['ebitda_margin_target'] + SENSITIVITY_MARGIN_DELTAS
+    base_growth = np.full(n, assumptions['stage1_revenue_growth'])
+    base_margin = np.full(n, assumptions['ebitda_margin_target'])
+    base_rfr = np.full(n, assumptions['risk_free_rate'])
+    base_tg = np.full(n, assumptions['terminal_growth'])
+    
+    # Blocks of n rows: growth, margin, WACC, terminal growth, then the growth-major n x n grid
+    grid = {
+        'stage1_revenue_growth': np.concatenate([growth, base_growth, base_growth, base_growth,
+                                                 np.repeat(growth, n)]),
+        'ebitda_margin_target': np.concatenate([base_margin, margin, base_margin, base_margin,
+                                                np.tile(margin, n)]),
+        'risk_free_rate': np.concatenate([base_rfr, base_rfr, base_rfr + SENSITIVITY_WACC_DELTAS, base_rfr,
+                                          np.full(n * n, assumptions['risk_free_rate'])]),
+        'terminal_growth': np.concatenate([base_tg, base_tg, base_tg, base_tg + SENSITIVITY_WACC_DELTAS,
+                                           np.full(n * n, assumptions['terminal_growth'])]),
     }
+    batch = calculate_3stage_dcf_batch(fundamentals, grid, assumptions)
+    price = batch['price_per_share'].tolist()
+    upside = batch['upside_downside'].tolist()
+    
+    def one_way(block: int, name: str, values: list) -> list:
+        rows = range(block * n, (block + 1) * n)
+        return [{name: values[i], 'price_per_share': price[i], 'upside_downside': upside[i]} for i in rows]
+    
+    return {
+        'revenue_growth_sensitivity': one_way(0, 'growth_rate', grid['stage1_revenue_growth'].tolist()),
+        'margin_sensitivity': one_way(1, 'ebitda_margin', grid['ebitda_margin_target'].tolist()),
+        'wacc_sensitivity': one_way(2, 'wacc', batch['wacc'].tolist()),
+        'terminal_growth_sensitivity': one_way(3, 'terminal_growth', batch['terminal_growth'].tolist()),
+        'two_way_sensitivity': [
+            {'revenue_growth': g, 'ebitda_margin': m, 'price_per_share': p, 'upside_downside': u}
+            for g, m, p, u in zip(grid['stage1_revenue_growth'][4 * n:].tolist(),
+                                  grid['ebitda_margin_target'][4 * n:].tolist(),
+                                  price[4 * n:], upside[4 * n:])
+        ]
+    }
+
+
+def projections_to_dicts(projections: np.ndarray) -> List[Dict[str, Any]]:
+    """Expand a PROJECTION_DTYPE record array into per-year dicts for JSON responses.
+    Stage 1 rows omit growth_rate (growth is constant within the stage).
+    """
+    rows = []
+    for record in projections.tolist():
+        row = dict(zip(PROJECTION_DTYPE.names, record))
+        if row['stage'] == 1:
+            del row['growth_rate']
+        rows.append(row)
+    return rows
 
 
 def generate_3stage_assumptions(fundamentals: Dict[str, Any], custom: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -1751,64 +2133,47 @@ def generate_3stage_assumptions(fundamentals: Dict[str, Any], custom: Dict[str,
     market_cap = fundamentals.get('market_cap', 0)
     revenue = fundamentals.get('revenue', 0)
     
-    logger.info(f"[Assumptions] Historical growth: {historical_growth:.1%}, "
-               f"Analyst growth: {analyst_growth_3y:.1%}, "
-               f"Blended: {stage1_growth:.1%}")
+    logger.info("[Assumptions] Historical growth: %.1f%%, Analyst growth: %.1f%%, Blended: %.1f%%",
+                historical_growth * 100, analyst_growth_3y * 100, stage1_growth * 100)
     
     # === MARGIN EXPECTATIONS WITH MEAN REVERSION ===
     current_ebitda_margin = fundamentals.get('ebitda_margin', 0.20)
     sector = fundamentals.get('sector', 'Technology')
     
     # Professional Standard: Sector-based margin targets (mean reversion)
-    sector_margin_targets = {
-        'Technology': 0.30,
-        'Healthcare': 0.20,
-        'Financial Services': 0.25,
-        'Consumer Defensive': 0.15,
-        'Consumer Cyclical': 0.12,
-        'Industrials': 0.15,
-        'Energy': 0.18,
-        'Utilities': 0.22,
-        'Real Estate': 0.35,
-        'Communication Services': 0.25,
-        'Basic Materials': 0.18
-    }
-    sector_target = sector_margin_targets.get(sector, 0.25)
+    sector_target = SECTOR_MARGIN_TARGETS.get(sector, 0.25)
     
     # HANDLE ZERO/NEGATIVE MARGINS: Use sector-appropriate targets
     if current_ebitda_margin <= 0:
-        logger.warning(f"[Margin Validation] Zero/negative EBITDA margin {current_ebitda_margin:.1%} detected")
-        logger.warning(f"[Margin Validation] Using sector-appropriate target for {sector}")
+        logger.warning("[Margin Validation] Zero/negative EBITDA margin %.1f%% detected", current_ebitda_margin * 100)
+        logger.warning("[Margin Validation] Using sector-appropriate target for %s", sector)
         current_ebitda_margin = 0.05  # Start at 5%
         margin_target = sector_target
     # MEAN REVERSION: High margins revert down, low margins improve
     elif current_ebitda_margin > sector_target * 1.5:  # 50% above sector
         # High margins face competitive pressure - revert DOWN
         margin_target = current_ebitda_margin * 0.95  # Decline 5%
-        logger.info(f"[Margin Mean Reversion] High margin {current_ebitda_margin:.1%} > sector {sector_target:.1%}, reverting DOWN to {margin_target:.1%}")
+        logger.info("[Margin Mean Reversion] High margin %.1f%% > sector %.1f%%, reverting DOWN to %.1f%%",
+                    current_ebitda_margin * 100, sector_target * 100, margin_target * 100)
     elif current_ebitda_margin > sector_target:
         # Above sector average - maintain or slight decline
         margin_target = max(current_ebitda_margin * 0.98, sector_target)  # Slight decline
-        logger.info(f"[Margin Mean Reversion] Above-average margin {current_ebitda_margin:.1%}, maintaining near current")
+        logger.info("[Margin Mean Reversion] Above-average margin %.1f%%, maintaining near current", current_ebitda_margin * 100)
     else:
         # Below sector average - improve towards sector norm
         margin_target = min(current_ebitda_margin * 1.10, sector_target)  # Improve 10% max
-        logger.info(f"[Margin Mean Reversion] Below-average margin {current_ebitda_margin:.1%}, improving towards sector {sector_target:.1%}")
+        logger.info("[Margin Mean Reversion] Below-average margin %.1f%%, improving towards sector %.1f%%",
+                    current_ebitda_margin * 100, sector_target * 100)
     
-    logger.info(f"[Assumptions] EBITDA margin: {current_ebitda_margin:.1%} → {margin_target:.1%}")
+    logger.info("[Assumptions] EBITDA margin: %.1f%% → %.1f%%", current_ebitda_margin * 100, margin_target * 100)
     
     # === MOAT ASSESSMENT ===
     moat = fundamentals.get('economic_moat', 'none')
     
     # Moat-adjusted terminal growth
-    if moat == 'wide':
-        terminal_growth = 0.045
-    elif moat == 'narrow':
-        terminal_growth = 0.038
-    else:
-        terminal_growth = 0.030
+    terminal_growth = MOAT_TERMINAL_GROWTH.get(moat, MOAT_TERMINAL_GROWTH['none'])
     
-    logger.info(f"[Assumptions] Moat: {moat}, Terminal growth: {terminal_growth:.1%}")
+    logger.info("[Assumptions] Moat: %s, Terminal growth: %.1f%%", moat, terminal_growth * 100)
     
     # === CAPEX MODELING ===
     capex_accelerating = fundamentals.get('capex_accelerating', False)
@@ -1816,9 +2181,9 @@ def generate_3stage_assumptions(fundamentals: Dict[str, Any], custom: Dict[str,
     
     # HANDLE EXTREME CAPEX: Cap at reasonable levels for growth companies
     if capex_to_revenue > 0.50:  # More than 50% of revenue
-        logger.warning(f"[CapEx Validation] Extreme CapEx ratio {capex_to_revenue:.1%} detected")
-        logger.warning(f"[CapEx Validation] This indicates heavy growth investment phase")
-        logger.warning(f"[CapEx Validation] Capping at 15% for steady-state projection")
+        logger.warning("[CapEx Validation] Extreme CapEx ratio %.1f%% detected", capex_to_revenue * 100)
+        logger.warning("[CapEx Validation] This indicates heavy growth investment phase")
+        logger.warning("[CapEx Validation] Capping at 15% for steady-state projection")
         capex_to_revenue = 0.15  # Cap at 15% for projection purposes
     
     if capex_accelerating:
@@ -1826,8 +2191,8 @@ def generate_3stage_assumptions(fundamentals: Dict[str, Any], custom: Dict[str,
     else:
         capex_pct = max(capex_to_revenue, 0.04)
     
-    logger.info(f"[Assumptions] CapEx: {capex_pct:.1%} of revenue "
-               f"({'accelerating' if capex_accelerating else 'stable'})")
+    logger.info("[Assumptions] CapEx: %.1f%% of revenue (%s)",
+                capex_pct * 100, 'accelerating' if capex_accelerating else 'stable')
     
     # === WACC COMPONENTS ===
     beta = fundamentals.get('beta', 1.0)
@@ -1836,17 +2201,17 @@ def generate_3stage_assumptions(fundamentals: Dict[str, Any], custom: Dict[str,
     # Extreme betas indicate data quality issues or unsustainable volatility
     original_beta = beta
     if beta > 2.5:
-        logger.warning(f"[Beta Validation] Extreme beta {beta:.2f} detected, capping at 2.5")
+        logger.warning("[Beta Validation] Extreme beta %.2f detected, capping at 2.5", beta)
         beta = 2.5
     elif beta < 0.3:
-        logger.warning(f"[Beta Validation] Unusually low beta {beta:.2f} detected, flooring at 0.3")
+        logger.warning("[Beta Validation] Unusually low beta %.2f detected, flooring at 0.3", beta)
         beta = 0.3
     
     # Consider using industry-adjusted beta for extreme cases
     if original_beta > 2.0:
         industry_beta = 1.2  # Technology sector average
         adjusted_beta = beta * 0.33 + industry_beta * 0.67  # 67% weight to industry
-        logger.info(f"[Beta Validation] Adjusting extreme beta {original_beta:.2f} → {adjusted_beta:.2f} using industry average")
+        logger.info("[Beta Validation] Adjusting extreme beta %.2f → %.2f using industry average", original_beta, adjusted_beta)
         beta = adjusted_beta
     
     total_debt = fundamentals.get('total_debt', 0)
@@ -1856,16 +2221,14 @@ def generate_3stage_assumptions(fundamentals: Dict[str, Any], custom: Dict[str,
     cost_of_debt = max(0.03, min(0.10, cost_of_debt))
     
     # === Working capital days (estimate from statements when possible) ===
-    dso_dio_dpo = {'dso': 45.0, 'dio': 60.0, 'dpo': 45.0}
-    try:
-        # Attempt to estimate from yfinance dataframes if available in fundamentals
-        # Not stored directly; fall back to heuristics based on margins/sector behavior
-        if fundamentals.get('gross_margin', 0.4) > 0.6:
-            dso_dio_dpo = {'dso': 40.0, 'dio': 30.0, 'dpo': 50.0}
-        elif fundamentals.get('gross_margin', 0.4) < 0.3:
-            dso_dio_dpo = {'dso': 55.0, 'dio': 70.0, 'dpo': 45.0}
-    except Exception:
-        pass
+    # Not stored directly in fundamentals; fall back to heuristics based on margins
+    gross_margin = fundamentals.get('gross_margin', 0.4)
+    if gross_margin > 0.6:
+        dso_dio_dpo = HIGH_MARGIN_WORKING_CAPITAL_DAYS
+    elif gross_margin < 0.3:
+        dso_dio_dpo = LOW_MARGIN_WORKING_CAPITAL_DAYS
+    else:
+        dso_dio_dpo = DEFAULT_WORKING_CAPITAL_DAYS
 
     # === BUILD ASSUMPTIONS ===
     assumptions = {
@@ -1892,7 +2255,7 @@ def generate_3stage_assumptions(fundamentals: Dict[str, Any], custom: Dict[str,
             'constraint_applied': bool(blended_growth > 1.0),
             'constraint_reason': f"Only sanity cap at 100% applied" if blended_growth > 1.0 else "No caps applied - see H-Model for growth decay handling",
             'market_cap': market_cap,
-            'size_category': 'mega-cap' if market_cap > 3e12 else 'large-cap' if market_cap > 1e12 else 'mid-large' if market_cap > 500e9 else 'mid-cap' if market_cap > 10e9 else 'small-cap',
+            'size_category': MARKET_CAP_SIZE_CATEGORIES[bisect_left(MARKET_CAP_SIZE_THRESHOLDS, market_cap)],
             'note': 'High-growth companies use H-Model (natural decay) instead of 3-Stage (artificial caps)'
         },
         'margin_adjustments': {
@@ -1937,7 +2300,7 @@ def generate_3stage_assumptions(fundamentals: Dict[str, Any], custom: Dict[str,
         
         # Metadata
         'model': '3-stage DCF (Enhanced)',
-        'generated_at': datetime.now().isoformat()
+        'generated_at': _iso_now_cached()
     }
     
     # Override with custom
@@ -1953,16 +2316,76 @@ def generate_3stage_assumptions(fundamentals: Dict[str, Any], custom: Dict[str,
 # H-MODEL DCF (from python-hmodel)
 # ============================================================================
 
+def _hmodel_grid(fcf_current: float, g_high: float, g_low: float, H: float,
+                 wacc: float) -> tuple:
+    """H-Model components over the 5x5 Growth vs WACC grid in one NumPy pass.
+    
+    The centre cell [2, 2] carries zero deltas, so it is the base-case valuation.
+    Returns: (g_high, g_low, wacc, pv_terminal, pv_excess_growth) as 5x5 arrays
+    """
+    # Growth deltas as a column, WACC deltas as a row: broadcasting yields the full grid
+    delta_g = SENSITIVITY_GROWTH_DELTAS[:, None]
+    adj_g_high = np.broadcast_to(g_high + delta_g, (5, 5))
+    adj_wacc = np.broadcast_to(wacc + SENSITIVITY_WACC_DELTAS, (5, 5))
+    adj_g_low = g_low + (delta_g / 2)
+    
+    # Ensure g_low < wacc
+    adj_g_low = np.where(adj_g_low >= adj_wacc, adj_wacc * 0.6, adj_g_low)
+    
+    # H-Model formula
+    spread = adj_wacc - adj_g_low
+    pv_term = (fcf_current * (1 + adj_g_low)) / spread
+    pv_excess = (fcf_current * H * (adj_g_high - adj_g_low)) / spread
+    return adj_g_high, adj_g_low, adj_wacc, pv_term, pv_excess
+
+
+def _hmodel_core(fcf_current: float, g_high: float, g_low: float, H: float, wacc: float,
+                 cash: float, total_debt: float, shares_outstanding: float,
+                 avg_buyback_rate: float) -> tuple:
+    """Pure H-Model arithmetic (no dict I/O or logging).
+    
+    Expects g_low < wacc already enforced, so the grid's centre cell is the
+    unguarded point estimate.
+    Returns: (pv_terminal, pv_excess_growth, enterprise_value, shares_reduction_factor,
+              shares_outstanding_adjusted, net_debt, equity_value, grid)
+    """
+    # Components 1 & 2: PV of terminal growth and excess growth, with the sensitivity grid
+    grid = _hmodel_grid(fcf_current, g_high, g_low, H, wacc)
+    pv_terminal = float(grid[3][2, 2])
+    pv_excess_growth = float(grid[4][2, 2])
+    
+    # Total enterprise value
+    enterprise_value = pv_terminal + pv_excess_growth
+    
+    # Share buyback adjustment
+    # (1 - r) ** (2H) as exp(log1p(-r) * 2H); no buyback (the common case) is exactly 1
+    years_to_maturity = 2 * H
+    if avg_buyback_rate == 0:
+        shares_reduction_factor = 1.0
+    elif avg_buyback_rate < 1:
+        shares_reduction_factor = math.exp(math.log1p(-avg_buyback_rate) * years_to_maturity)
+    else:
+        shares_reduction_factor = (1 - avg_buyback_rate) ** years_to_maturity
+    shares_outstanding_adjusted = shares_outstanding * shares_reduction_factor
+    
+    # Equity value
+    net_debt = total_debt - cash
+    equity_value = enterprise_value - net_debt
+    
+    return (pv_terminal, pv_excess_growth, enterprise_value, shares_reduction_factor,
+            shares_outstanding_adjusted, net_debt, equity_value, grid)
+
+
 def calculate_hmodel(fundamentals: Dict[str, Any], assumptions: Dict[str, Any]) -> Dict[str, Any]:
     """Calculate H-Model DCF valuation"""
-    logger.info(f"[H-Model] Starting calculation for {fundamentals['ticker']}")
+    logger.info("[H-Model] Starting calculation for %s", fundamentals['ticker'])
     
     # Extract fundamentals
     fcf_current = fundamentals['free_cash_flow']
     
     # HANDLE NEGATIVE FCF: Use sector-specific revenue-based proxy
     if fcf_current <= 0:
-        logger.warning(f"[H-Model] Negative FCF ${fcf_current/1e6:.1f}M detected - using sector-specific proxy")
+        logger.warning("[H-Model] Negative FCF $%.1fM detected - using sector-specific proxy", fcf_current / 1e6)
         
         revenue = fundamentals['revenue']
         sector = fundamentals.get('sector', '')
@@ -1989,17 +2412,19 @@ def calculate_hmodel(fundamentals: Dict[str, Any], assumptions: Dict[str, Any])
         # ADJUST BY COMPANY STAGE/SIZE
         if market_cap < 5_000_000_000:  # <$5B (small-cap growth)
             target_fcf_margin *= 1.3  # 30% higher for high-growth potential
-            logger.info(f"[H-Model FCF Proxy] Small-cap adjustment: +30%")
+            logger.info("[H-Model FCF Proxy] Small-cap adjustment: +30%")
         elif market_cap < 50_000_000_000:  # <$50B (mid-cap)
             target_fcf_margin *= 1.15  # 15% higher for growth
-            logger.info(f"[H-Model FCF Proxy] Mid-cap adjustment: +15%")
+            logger.info("[H-Model FCF Proxy] Mid-cap adjustment: +15%")
         
         # Calculate proxy FCF
         fcf_current = revenue * target_fcf_margin
         
-        logger.info(f"[H-Model FCF Proxy] Sector: {sector}")
-        logger.info(f"[H-Model FCF Proxy] Target margin: {target_fcf_margin:.1%} of revenue")
-        logger.info(f"[H-Model FCF Proxy] Proxy FCF: ${fcf_current/1e6:.1f}M (Revenue ${revenue/1e6:.1f}M × {target_fcf_margin:.1%})")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("[H-Model FCF Proxy] Sector: %s", sector)
+            logger.info("[H-Model FCF Proxy] Target margin: %.1f%% of revenue", target_fcf_margin * 100)
+            logger.info("[H-Model FCF Proxy] Proxy FCF: $%.1fM (Revenue $%.1fM × %.1f%%)",
+                        fcf_current / 1e6, revenue / 1e6, target_fcf_margin * 100)
     
     current_price = fundamentals['current_price']
     shares_outstanding = fundamentals['shares_outstanding']
@@ -2025,30 +2450,16 @@ def calculate_hmodel(fundamentals: Dict[str, Any], assumptions: Dict[str, Any])
     
     # Validate: g_low must < WACC
     if g_low >= wacc:
-        logger.warning(f"Terminal growth {g_low:.2%} >= WACC {wacc:.2%}, adjusting")
+        logger.warning("Terminal growth %.2f%% >= WACC %.2f%%, adjusting", g_low * 100, wacc * 100)
         g_low = wacc * 0.5
         assumptions['g_low'] = g_low
     
-    # === H-MODEL FORMULA ===
-    
-    # Component 1: PV of terminal growth
-    pv_terminal = (fcf_current * (1 + g_low)) / (wacc - g_low)
-    
-    # Component 2: PV of excess growth
-    pv_excess_growth = (fcf_current * H * (g_high - g_low)) / (wacc - g_low)
-    
-    # Total enterprise value
-    enterprise_value = pv_terminal + pv_excess_growth
-    
-    # Share buyback adjustment
-    years_to_maturity = 2 * H
-    avg_buyback_rate = assumptions.get('annual_buyback_rate', 0)
-    shares_reduction_factor = (1 - avg_buyback_rate) ** years_to_maturity
-    shares_outstanding_adjusted = shares_outstanding * shares_reduction_factor
-    
-    # === EQUITY VALUE ===
-    net_debt = total_debt - cash
-    equity_value = enterprise_value - net_debt
+    # === H-MODEL FORMULA + EQUITY VALUE ===
+    (pv_terminal, pv_excess_growth, enterprise_value, shares_reduction_factor,
+     shares_outstanding_adjusted, net_debt, equity_value, grid) = _hmodel_core(
+        fcf_current, g_high, g_low, H, wacc, cash, total_debt, shares_outstanding,
+        assumptions.get('annual_buyback_rate', 0)
+    )
     
     # === PRICE PER SHARE ===
     if shares_outstanding_adjusted <= 0:
@@ -2059,19 +2470,13 @@ def calculate_hmodel(fundamentals: Dict[str, Any], assumptions: Dict[str, Any])
     # Upside/Downside
     upside_downside = ((price_per_share - current_price) / current_price) * 100 if current_price > 0 else 0
     
-    logger.info(f"[H-Model] Fair value: ${price_per_share:.2f}, Current: ${current_price:.2f}, "
-               f"Upside: {upside_downside:.1f}%")
+    logger.info("[H-Model] Fair value: $%.2f, Current: $%.2f, Upside: %.1f%%",
+                price_per_share, current_price, upside_downside)
     
     # === SENSITIVITY ANALYSIS ===
-    sensitivity_matrix = calculate_sensitivity(
-        fcf_current=fcf_current,
-        g_high=g_high,
-        g_low=g_low,
-        H=H,
-        wacc=wacc,
-        net_debt=net_debt,
-        shares_outstanding=shares_outstanding_adjusted
-    )
+    sensitivity_matrix = _sensitivity_rows(grid, net_debt, shares_outstanding_adjusted)
+    
+    inv_ev = 1.0 / enterprise_value if enterprise_value > 0 else 0.0
     
     return {
         'model': 'hmodel',
@@ -2085,14 +2490,14 @@ def calculate_hmodel(fundamentals: Dict[str, Any], assumptions: Dict[str, Any])
         'wacc': wacc,
         'pv_terminal': pv_terminal,
         'pv_excess_growth': pv_excess_growth,
-        'pv_terminal_percent': pv_terminal / enterprise_value if enterprise_value > 0 else 0,
-        'pv_excess_growth_percent': pv_excess_growth / enterprise_value if enterprise_value > 0 else 0,
+        'pv_terminal_percent': pv_terminal * inv_ev,
+        'pv_excess_growth_percent': pv_excess_growth * inv_ev,
         'fcf_current': fcf_current,
         'shares_outstanding_adjusted': shares_outstanding_adjusted,
         'shares_reduction': 1 - shares_reduction_factor,
         'assumptions': assumptions,
         'sensitivity_matrix': sensitivity_matrix,
-        'calculation_date': datetime.now().isoformat()
+        'calculation_date': _iso_now_cached()
     }
 
 
@@ -2108,23 +2513,23 @@ def generate_hmodel_assumptions(fundamentals: Dict[str, Any], custom: Dict[str,
     # Beta with validation
     beta = fundamentals.get('beta', 1.0)
     
-    # PROFESSIONAL STANDARD: Cap beta at reasonable levels
+    # PROFESSIONAL STANDARD: Cap beta at reasonable levels, and blend extreme
+    # betas (> 2.0) toward the industry average
     original_beta = beta
-    if beta > 2.5:
-        logger.warning(f"[H-Model Beta Validation] Extreme beta {beta:.2f} detected, capping at 2.5")
-        beta = 2.5
-    elif beta < 0.3:
-        logger.warning(f"[H-Model Beta Validation] Unusually low beta {beta:.2f} detected, flooring at 0.3")
-        beta = 0.3
-    
-    # Consider using industry-adjusted beta for extreme cases
     if original_beta > 2.0:
+        if beta > 2.5:
+            logger.warning("[H-Model Beta Validation] Extreme beta %.2f detected, capping at 2.5", beta)
+            beta = 2.5
         industry_beta = 1.2  # Technology sector average
         adjusted_beta = beta * 0.33 + industry_beta * 0.67  # 67% weight to industry
-        logger.info(f"[H-Model Beta Validation] Adjusting extreme beta {original_beta:.2f} → {adjusted_beta:.2f} using industry average")
+        logger.info("[H-Model Beta Validation] Adjusting extreme beta %.2f → %.2f using industry average",
+                    original_beta, adjusted_beta)
         beta = adjusted_beta
+    elif beta < 0.3:
+        logger.warning("[H-Model Beta Validation] Unusually low beta %.2f detected, flooring at 0.3", beta)
+        beta = 0.3
     
-    # Market cap stage
+    # Market cap stage (also the buyback-rate denominator)
     market_cap = fundamentals['current_price'] * fundamentals['shares_outstanding']
     
     # Determine H (half-life) based on company size
@@ -2144,8 +2549,7 @@ def generate_hmodel_assumptions(fundamentals: Dict[str, Any], custom: Dict[str,
     
     # Buyback rate
     share_repurchases = fundamentals.get('share_repurchases', 0)
-    market_cap_value = fundamentals['current_price'] * fundamentals['shares_outstanding']
-    annual_buyback_rate = share_repurchases / market_cap_value if market_cap_value > 0 else 0
+    annual_buyback_rate = share_repurchases / market_cap if market_cap > 0 else 0
     
     assumptions = {
         # Growth parameters
@@ -2165,7 +2569,7 @@ def generate_hmodel_assumptions(fundamentals: Dict[str, Any], custom: Dict[str,
         
         # Metadata
         'model': 'H-Model DCF',
-        'generated_at': datetime.now().isoformat()
+        'generated_at': _iso_now_cached()
     }
     
     # Override with custom
@@ -2176,50 +2580,35 @@ def generate_hmodel_assumptions(fundamentals: Dict[str, Any], custom: Dict[str,
 
 def calculate_sensitivity(fcf_current: float, g_high: float, g_low: float, H: float,
                          wacc: float, net_debt: float, shares_outstanding: float) -> list:
-    """Two-way sensitivity: Growth vs WACC"""
-    sensitivity = []
-    
-    # Growth deltas: -2%, -1%, 0%, +1%, +2%
-    growth_deltas = [-0.02, -0.01, 0, 0.01, 0.02]
-    
-    # WACC deltas: -1%, -0.5%, 0%, +0.5%, +1%
-    wacc_deltas = [-0.01, -0.005, 0, 0.005, 0.01]
-    
-    for delta_g in growth_deltas:
-        for delta_wacc in wacc_deltas:
-            adj_g_high = g_high + delta_g
-            adj_g_low = g_low + (delta_g / 2)
-            adj_wacc = wacc + delta_wacc
-            
-            # Ensure g_low < wacc
-            if adj_g_low >= adj_wacc:
-                adj_g_low = adj_wacc * 0.6
-            
-            # H-Model formula
-            pv_term = (fcf_current * (1 + adj_g_low)) / (adj_wacc - adj_g_low)
-            pv_excess = (fcf_current * H * (adj_g_high - adj_g_low)) / (adj_wacc - adj_g_low)
-            ev = pv_term + pv_excess
-            equity_value = ev - net_debt
-            price = equity_value / shares_outstanding if shares_outstanding > 0 else 0
-            
-            sensitivity.append({
-                'g_high': adj_g_high,
-                'g_low': adj_g_low,
-                'wacc': adj_wacc,
-                'price': price
-            })
+    """Two-way sensitivity: Growth vs WACC (5x5 grid, growth-major order)"""
+    return _sensitivity_rows(_hmodel_grid(fcf_current, g_high, g_low, H, wacc),
+                             net_debt, shares_outstanding)
+
+
+def _sensitivity_rows(grid: tuple, net_debt: float, shares_outstanding: float) -> list:
+    """Price each cell of an _hmodel_grid and flatten it to the response rows"""
+    adj_g_high, adj_g_low, adj_wacc, pv_term, pv_excess = grid
+    equity_value = pv_term + pv_excess - net_debt
+    price = equity_value / shares_outstanding if shares_outstanding > 0 else np.zeros((5, 5))
     
-    return sensitivity
+    return [
+        {'g_high': gh, 'g_low': gl, 'wacc': w, 'price': p}
+        for gh, gl, w, p in zip(adj_g_high.ravel().tolist(), adj_g_low.ravel().tolist(),
+                                adj_wacc.ravel().tolist(), price.ravel().tolist())
+    ]
 
 
 # ============================================================================
 # SHARED UTILITIES
 # ============================================================================
 
+@lru_cache(maxsize=4096)
 def calculate_wacc(risk_free_rate: float, beta: float, market_risk_premium: float,
                    cost_of_debt: float, market_value_equity: float, market_value_debt: float,
                    tax_rate: float) -> float:
-    """Calculate WACC using CAPM"""
+    """Calculate WACC using CAPM.
+    Pure function of its inputs, memoized; validation logs fire on the first call only.
+    """
     cost_of_equity = risk_free_rate + (beta * market_risk_premium)
     total_value = market_value_equity + market_value_debt
     
@@ -2227,33 +2616,35 @@ def calculate_wacc(risk_free_rate: float, beta: float, market_risk_premium: floa
         logger.warning("Total value is 0, using 100% equity WACC")
         return cost_of_equity
     
-    weight_equity = market_value_equity / total_value
-    weight_debt = market_value_debt / total_value
-    
-    wacc = (weight_equity * cost_of_equity) + (weight_debt * cost_of_debt * (1 - tax_rate))
+    # Value-weighted cost of capital with a single division by total value
+    after_tax_cost_of_debt = cost_of_debt * (1.0 - tax_rate)
+    wacc = (market_value_equity * cost_of_equity + market_value_debt * after_tax_cost_of_debt) / total_value
     
     # PROFESSIONAL STANDARD: Cap WACC at reasonable levels
     if wacc > 0.25:  # 25% is already very high
-        logger.warning(f"[WACC Validation] Extreme WACC {wacc:.2%} detected (likely due to high beta)")
-        logger.warning(f"[WACC Validation] Beta: {beta:.2f}, CoE: {cost_of_equity:.2%}")
-        logger.warning(f"[WACC Validation] Capping WACC at 25% for valuation stability")
+        logger.warning("[WACC Validation] Extreme WACC %.2f%% detected (likely due to high beta)", wacc * 100)
+        logger.warning("[WACC Validation] Beta: %.2f, CoE: %.2f%%", beta, cost_of_equity * 100)
+        logger.warning("[WACC Validation] Capping WACC at 25% for valuation stability")
         wacc = 0.25
     elif wacc < 0.05:  # Less than 5% is unrealistically low
-        logger.warning(f"[WACC Validation] Unusually low WACC {wacc:.2%} detected, flooring at 5%")
+        logger.warning("[WACC Validation] Unusually low WACC %.2f%% detected, flooring at 5%%", wacc * 100)
         wacc = 0.05
     
-    logger.info(f"[WACC] CoE: {cost_of_equity:.2%}, CoD: {cost_of_debt:.2%}, "
-               f"E/V: {weight_equity:.1%}, D/V: {weight_debt:.1%}, WACC: {wacc:.2%}")
+    if logger.isEnabledFor(logging.INFO):
+        # Weights are only needed for the log line
+        logger.info("[WACC] CoE: %.2f%%, CoD: %.2f%%, E/V: %.1f%%, D/V: %.1f%%, WACC: %.2f%%",
+                    cost_of_equity * 100, cost_of_debt * 100, market_value_equity / total_value * 100,
+                    market_value_debt / total_value * 100, wacc * 100)
     
     return wacc
 
 
-def maybe_calculate_dynamic_wacc(base_wacc: float, assumptions: Dict[str, Any],
+def maybe_calculate_dynamic_wacc(base_wacc: float, assumptions: DCFAssumptions,
                                  market_value_equity: float, market_value_debt: float) -> float:
     """Optionally adjust WACC slightly over time based on leverage if enabled.
     This is a light-touch approach; default is to keep WACC static for stability.
     """
-    if not assumptions.get('enable_dynamic_wacc'):
+    if not assumptions.enable_dynamic_wacc:
         return base_wacc
     total_value = market_value_equity + market_value_debt
     if total_value <= 0:
@@ -2431,18 +2822,11 @@ def calculate_confidence_score(fundamentals: Dict[str, Any], results: list,
 
 def generate_recommendation(upside: float) -> str:
     """Generate buy/sell recommendation from upside %"""
-    if upside > 20:
-        return 'STRONG BUY'
-    elif upside > 10:
-        return 'BUY'
-    elif upside > -5:
-        return 'HOLD'
-    elif upside > -15:
-        return 'SELL'
-    else:
-        return 'STRONG SELL'
+    return RECOMMENDATION_LABELS[bisect_left(RECOMMENDATION_THRESHOLDS, upside)]
 
 
 if __name__ == '__main__':
+    # Local development only: containers serve main:app through gunicorn (see Dockerfile).
+    # Set FLASK_DEBUG=1 for the reloader/debugger.
     port = int(os.environ.get('PORT', 8086))
-    app.run(host='0.0.0.0', port=port, debug=True)
+    app.run(host='0.0.0.0', port=port, debug=bool(os.environ.get('FLASK_DEBUG')))
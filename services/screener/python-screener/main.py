@@ -1,13 +1,25 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+import numpy as np
 import pandas as pd
-import yfinance as yf
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import datetime
 from typing import Dict, List, Any, Optional
+from functools import lru_cache
+import hashlib
+import importlib.util
+import json
 import logging
+import threading
+import time
+# yfinance and finvizfinance are heavy imports, so they load on first screen rather than
+# at worker boot; availability is checked without importing
+FINVIZ_AVAILABLE = importlib.util.find_spec('finvizfinance') is not None
 try:
-    from finvizfinance.screener.overview import Overview  # type: ignore
-    FINVIZ_AVAILABLE = True
-except Exception:
-    FINVIZ_AVAILABLE = False
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -15,6 +27,28 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+if ORJSON_AVAILABLE:
+    class OrjsonProvider(DefaultJSONProvider):
+        """Serialize jsonify() responses with orjson (NumPy-aware; NaN/inf become null)."""
+
+        def _dumps_bytes(self, obj: Any) -> bytes:
+            return orjson.dumps(
+                obj, default=self.default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            )
+
+        def dumps(self, obj: Any, **kwargs: Any) -> str:
+            return self._dumps_bytes(obj).decode()
+
+        def response(self, *args: Any, **kwargs: Any) -> Any:
+            # Hand orjson's bytes straight to the response (no str decode/re-encode round-trip)
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(self._dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+        def loads(self, s: Any, **kwargs: Any) -> Any:
+            return orjson.loads(s)
+
+    app.json = OrjsonProvider(app)
+
 @app.route('/', methods=['GET'])
 def root():
     """Root endpoint - service information"""
@@ -24,10 +58,11 @@ def root():
         'status': 'running',
         'endpoints': {
             'health': '/health',
-            'screen': '/screen (POST)'
+            'screen': '/screen (POST)',
+            'screen_stream': '/screen/stream (POST, NDJSON)'
         },
         'data_sources': ['finviz', 'yfinance'],
-        'timestamp': pd.Timestamp.now().isoformat()
+        'timestamp': datetime.now().isoformat()
     })
 
 # Sector-specific P/E standards (2024 US market reality)
@@ -43,6 +78,135 @@ SECTOR_PE_STANDARDS = {
     'Energy': {'growth': 35, 'value': 15, 'average': 26.29},
     'Financial Services': {'growth': 25, 'value': 15, 'average': 15.54}
 }
+DEFAULT_SECTOR_PE_AVERAGE = 30
+# Overall market standards when no known sector is selected
+DEFAULT_SECTOR_PE_STANDARDS = {'growth': 50, 'value': 20, 'average': DEFAULT_SECTOR_PE_AVERAGE}
+
+# Lower-cased sector names -> Finviz sector filter values (insertion order sets fuzzy-match priority)
+SECTOR_TO_FINVIZ = {
+    'technology': 'Technology',
+    'healthcare': 'Healthcare',
+    'consumer defensive': 'Consumer Defensive',
+    'communication services': 'Communication Services',
+    'consumer cyclical': 'Consumer Cyclical',
+    'real estate': 'Real Estate',
+    'industrials': 'Industrials',
+    'basic materials': 'Basic Materials',
+    'energy': 'Energy',
+    'financial services': 'Financial Services',
+    'financial': 'Financial'
+}
+
+# Finviz 'Under $X' price filter bands, ascending
+FINVIZ_PRICE_BANDS = (1, 2, 3, 4, 5, 7, 10, 15, 20, 30, 40, 50)
+
+# Characters dropped from Finviz numeric strings ('1.5%', '1,234')
+NUMERIC_STRIP_TABLE = str.maketrans('', '', '%,')
+
+# Finviz market-cap suffix multipliers ('1.2B', '500M', ...)
+MARKET_CAP_MULTIPLIERS = {'K': 1_000, 'M': 1_000_000, 'B': 1_000_000_000, 'T': 1_000_000_000_000}
+
+# Sector P/E averages as a parallel array for vectorized scoring; the trailing
+# slot holds the default benchmark for sectors outside the table
+SECTOR_IDX = {sector: i for i, sector in enumerate(SECTOR_PE_STANDARDS)}
+SECTOR_AVG_PE = np.array([s['average'] for s in SECTOR_PE_STANDARDS.values()] + [DEFAULT_SECTOR_PE_AVERAGE])
+
+# Piecewise score ladders as (bins, scores) for np.digitize. '>' ladders are stored
+# negated so that strictly-greater comparisons map onto digitize's left-closed bins.
+SECTOR_PE_BINS = SECTOR_AVG_PE[:, None] * np.array([0.7, 0.9, 1.1, 1.3])
+PE_SCORES = np.array([90, 75, 60, 40, 20])
+GROWTH_PCT_BINS = -np.array([20, 15, 10, 5])
+GROWTH_SCORES = np.array([90, 80, 70, 60, 40])
+PB_BINS = np.array([1.0, 1.5, 2.0, 3.0])
+PB_SCORES = np.array([90, 75, 60, 40, 20])
+LOW_BETA_BINS = np.array([0.4, 0.6])       # beta < 0.8
+LOW_BETA_SCORES = np.array([40, 60, 70])
+HIGH_BETA_BINS = np.array([1.5, 2.0])      # beta > 1.2, bands closed on the right
+HIGH_BETA_SCORES = np.array([70, 60, 40])
+DIVIDEND_BINS = -np.array([4, 3, 2, 1])
+DIVIDEND_SCORES = np.array([90, 80, 70, 60, 40])
+
+# Overall-score weights per strategy, ordered (pe, growth, value, momentum, dividend)
+STRATEGY_WEIGHTS = {
+    'growth': np.array([0.3, 0.4, 0.0, 0.3, 0.0]),
+    'value': np.array([0.2, 0.0, 0.5, 0.0, 0.3]),
+    'income': np.array([0.1, 0.0, 0.3, 0.0, 0.6]),
+    'momentum': np.array([0.2, 0.3, 0.0, 0.5, 0.0]),
+    'balanced': np.array([0.25, 0.25, 0.20, 0.15, 0.15])
+}
+
+# Struct-of-arrays layout of the per-stock scoring inputs (missing values stored as 0)
+SCORE_INPUT_DTYPE = np.dtype([
+    ('pe_ratio', 'f8'),
+    ('pb_ratio', 'f8'),
+    ('revenue_growth', 'f8'),
+    ('beta', 'f8'),
+    ('dividend_yield', 'f8'),
+    ('sector_idx', 'i2')
+])
+
+# yfinance enrichment fan-out: worker threads and overall deadline for one screen
+YFINANCE_MAX_WORKERS = 12
+YFINANCE_ENRICH_TIMEOUT_SECONDS = 10
+
+class _TTLCache:
+    """Process-local, thread-safe cache whose entries expire after `ttl` seconds.
+    When full, expired entries are dropped first, then the oldest insertions.
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: Dict[Any, tuple] = {}  # {key: (expires_at, value)}
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any:
+        """Return the cached value, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def put(self, key: Any, value: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.maxsize:
+                for k in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+                    del self._entries[k]
+                while len(self._entries) >= self.maxsize:
+                    del self._entries[next(iter(self._entries))]
+            self._entries[key] = (now + self.ttl, value)
+
+# Serialized /screen responses keyed by a hash of the request
+SCREEN_CACHE_TTL_SECONDS = 300
+SCREEN_CACHE_MAXSIZE = 512
+_screen_cache = _TTLCache(SCREEN_CACHE_TTL_SECONDS, SCREEN_CACHE_MAXSIZE)
+
+# Finviz rows requested per screen (Finviz pages 20 rows at a time), the deeper fetch used
+# when post-filters leave fewer than SCREEN_CANDIDATES rows, and the rows scored per screen
+FINVIZ_FETCH_LIMIT = 100
+FINVIZ_MAX_FETCH_LIMIT = 500
+SCREEN_CANDIDATES = 50
+
+# Finviz screener_view frames keyed by (Finviz filter set, row limit)
+FINVIZ_CACHE_TTL_SECONDS = 300
+_finviz_cache = _TTLCache(FINVIZ_CACHE_TTL_SECONDS, 256)
+# Fetches in progress, so concurrent identical screens share one upstream call
+_finviz_inflight: Dict[tuple, Future] = {}
+_finviz_inflight_lock = threading.Lock()
+
+# yfinance enrichment results keyed by (symbol, Finviz price, beta, dividend %)
+YFINANCE_CACHE_TTL_SECONDS = 60
+_yfinance_cache = _TTLCache(YFINANCE_CACHE_TTL_SECONDS, 4096)
+
+def _screen_cache_key(filters: Dict[str, Any], style_weights: Dict[str, Any]) -> bytes:
+    """Order-insensitive hash of the screening request"""
+    payload = json.dumps({'filters': filters, 'style_weights': style_weights}, sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).digest()
 
 @app.route('/screen', methods=['POST'])
 def screen_stocks():
@@ -51,6 +215,12 @@ def screen_stocks():
         filters = data.get('filters', {})
         style_weights = data.get('style_weights', {})
         
+        cache_key = _screen_cache_key(filters, style_weights)
+        cached = _screen_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Screening cache hit for filters: {filters}")
+            return app.response_class(cached, mimetype='application/json')
+        
         logger.info(f"Screening with filters: {filters}")
         
         # Only use real Finviz data - fail fast if not available
@@ -62,7 +232,7 @@ def screen_stocks():
         data_source = 'finviz+yfinance'
         logger.info(f"✅ Finviz returned {len(results)} results")
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'data': results,
             'total_found': len(results),
@@ -70,6 +240,8 @@ def screen_stocks():
             'sector_adjustments': get_sector_adjustments(filters),
             'data_source': data_source  # NEW: indicates real vs mock
         })
+        _screen_cache.put(cache_key, response.get_data())
+        return response
         
     except Exception as e:
         logger.error(f"Screening error: {str(e)}")
@@ -78,6 +250,38 @@ def screen_stocks():
             'error': str(e)
         }), 500
 
+@app.route('/screen/stream', methods=['POST'])
+def screen_stocks_stream():
+    """NDJSON variant of /screen: a header line is sent before the Finviz/yfinance work starts,
+    then one line per stock and a closing summary (or error) line.
+    """
+    data = request.json or {}
+    filters = data.get('filters', {})
+    logger.info(f"Streaming screen with filters: {filters}")
+
+    def ndjson(obj: Dict[str, Any]) -> str:
+        return app.json.dumps(obj) + '\n'
+
+    def generate():
+        yield ndjson({
+            'type': 'header',
+            'filters_applied': filters,
+            'sector_adjustments': get_sector_adjustments(filters),
+            'data_source': 'finviz+yfinance'
+        })
+        try:
+            if not FINVIZ_AVAILABLE:
+                raise RuntimeError("Finviz service not available - real data required")
+            results = get_finviz_screener_results(filters)
+            for stock in results:
+                yield ndjson({'type': 'stock', 'data': stock})
+            yield ndjson({'type': 'summary', 'success': True, 'total_found': len(results)})
+        except Exception as e:
+            logger.error(f"Streaming screening error: {str(e)}")
+            yield ndjson({'type': 'error', 'success': False, 'error': str(e)})
+
+    return app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 
 def get_finviz_screener_results(filters: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Fetch real tickers from Finviz and compute sector-aware scores.
@@ -117,11 +321,13 @@ def get_finviz_screener_results(filters: Dict[str, Any]) -> List[Dict[str, Any]]
             finviz_filters_dict['Sector'] = finviz_sector
             logger.info(f"[Finviz] Adding Sector filter: {finviz_sector}")
 
-    # Price cap - Finviz uses signal filters
+    # Price cap: narrow the fetch with the tightest Finviz 'Under $X' band that still
+    # contains every price <= price_max; the exact cap is applied post-fetch
     price_max = filters.get('price_max')
     if isinstance(price_max, (int, float)) and price_max > 0:
-        # Finviz doesn't have direct price filters in screener_view, we'll filter post-fetch
-        pass
+        band = next((b for b in FINVIZ_PRICE_BANDS if b > price_max), None)
+        if band is not None:
+            finviz_filters_dict['Price'] = f'Under ${band}'
 
     # Market cap preference
     mcap = filters.get('market_cap_preference')
@@ -137,31 +343,22 @@ def get_finviz_screener_results(filters: Dict[str, Any]) -> List[Dict[str, Any]]
     # Dividend preference
     div_pref = filters.get('dividend_preference')
     if div_pref in ('low', 'moderate', 'high'):
-        # Filter for positive dividends post-fetch
-        pass
+        # Only dividend payers qualify; Finviz drops the rest upstream (re-checked post-fetch)
+        finviz_filters_dict['Dividend Yield'] = 'Positive (>0%)'
 
     # Build and fetch
     logger.info(f"[Finviz] Final filters_dict: {finviz_filters_dict or 'NO FILTERS (will return all stocks)'}")
-    screener = Overview()
-    # Finviz can handle empty dict {} to return all stocks, but NOT None
-    if finviz_filters_dict:
-        screener.set_filter(filters_dict=finviz_filters_dict)
-        logger.info(f"[Finviz] Filters set, calling screener_view...")
-    else:
-        logger.info(f"[Finviz] No filters, will return ALL stocks from Finviz...")
-    df: pd.DataFrame = screener.screener_view(limit=500, verbose=0)
-    logger.info(f"[Finviz] ✅ Got DataFrame with {len(df)} rows")
-
-    # Apply post-filters
-    if price_max:
-        df = df[df['Price'].astype(float) <= price_max] if 'Price' in df.columns else df
-    
-    if div_pref in ('low', 'moderate', 'high'):
-        if 'Dividend %' in df.columns:
-            df = df[df['Dividend %'].astype(str).str.rstrip('%').astype(float, errors='ignore') > 0]
-
-    # Keep up to 50 rows to stay light
-    df = df.head(50)
+    # Fetch a short first page; only go deeper when post-filters leave too few candidates
+    # and Finviz had more rows to give. Rows keep Finviz order, so the first
+    # SCREEN_CANDIDATES survivors are the same either way.
+    raw = _get_finviz_frame(finviz_filters_dict, FINVIZ_FETCH_LIMIT)
+    df = _apply_post_filters(raw, price_max, div_pref)
+    if len(df) < SCREEN_CANDIDATES and len(raw) >= FINVIZ_FETCH_LIMIT:
+        logger.info(f"[Finviz] Only {len(df)} rows after post-filters, fetching up to {FINVIZ_MAX_FETCH_LIMIT}")
+        df = _apply_post_filters(_get_finviz_frame(finviz_filters_dict, FINVIZ_MAX_FETCH_LIMIT), price_max, div_pref)
+
+    # Keep up to SCREEN_CANDIDATES rows to stay light
+    df = df.head(SCREEN_CANDIDATES)
 
     # Normalize columns
     columns = {c.lower().strip(): c for c in df.columns}
@@ -182,144 +379,236 @@ def get_finviz_screener_results(filters: Dict[str, Any]) -> List[Dict[str, Any]]
     beta_col = get_col('beta') or 'Beta'
     mcap_col = get_col('market cap') or get_col('marketcap') or 'Market Cap'
 
-    results: List[Dict[str, Any]] = []
-    for _, row in df.iterrows():
+    # Pass 1: parse Finviz rows (numeric columns converted column-wise up front;
+    # zipping plain column lists avoids building a Series per row as iterrows() does)
+    rows = zip(
+        _column_values(df, symbol_col, ''), _column_values(df, name_col, ''),
+        _column_values(df, sector_col, ''), _column_values(df, industry_col, ''),
+        _to_float_column(df, price_col), _to_float_column(df, pe_col), _to_float_column(df, pb_col),
+        _to_float_column(df, div_col), _to_float_column(df, beta_col), _parse_market_cap_column(df, mcap_col),
+    )
+
+    parsed: List[tuple] = []
+    for symbol, name, sector, industry, price, pe_ratio, pb_ratio, div_pct, beta, market_cap in rows:
         try:
-            symbol = str(row.get(symbol_col, '')).upper()
-            name = str(row.get(name_col, ''))
-            sector = str(row.get(sector_col, ''))
-            industry = str(row.get(industry_col, ''))
-            price = _to_float(row.get(price_col))
-            pe_ratio = _to_float(row.get(pe_col))
-            pb_ratio = _to_float(row.get(pb_col))
-            div_pct = _to_float(row.get(div_col))
-            beta = _to_float(row.get(beta_col))
-            market_cap = _parse_market_cap(row.get(mcap_col))
+            symbol = str(symbol).upper()
+            name = str(name)
+            sector = str(sector)
+            industry = str(industry)
             
             # Skip stocks with invalid market cap (nan, None, or 0)
             if market_cap is None or (isinstance(market_cap, float) and (market_cap != market_cap or market_cap <= 0)):
                 continue
 
-            # Enrich with yfinance for missing critical data
-            try:
-                y = yf.Ticker(symbol)
-                info = y.fast_info if hasattr(y, 'fast_info') else {}
-                y_info = y.info or {}
-                
-                # Get missing price and beta
-                price = price or _to_float(getattr(info, 'last_price', None) or info.get('lastPrice'))
-                beta = beta or _to_float(y_info.get('beta'))
-                
-                # Get missing dividend yield
-                if not div_pct:
-                    div_pct = _to_float(y_info.get('dividendYield'))
-                    if div_pct:
-                        div_pct = div_pct * 100  # Convert to percentage
-                
-                # Get revenue growth (5-year average)
-                revenue_growth = None
-                try:
-                    financials = y.financials
-                    if not financials.empty and len(financials.columns) >= 2:
-                        revenues = financials.loc['Total Revenue']
-                        if len(revenues) >= 2:
-                            latest_revenue = revenues.iloc[0]
-                            prev_revenue = revenues.iloc[1]
-                            if latest_revenue and prev_revenue and prev_revenue != 0:
-                                revenue_growth = (latest_revenue - prev_revenue) / abs(prev_revenue)
-                except Exception:
-                    pass
-                    
-            except Exception:
-                pass
-
-            # Compute scores
-            sector_benchmark = SECTOR_PE_STANDARDS.get(sector, {'average': 30})
-            pe_score = calculate_pe_score(pe_ratio or 0, sector_benchmark['average'])
-            growth_score = calculate_growth_score(revenue_growth or 0)
-            value_score = calculate_value_score(pe_ratio or 0, pb_ratio or 0, sector_benchmark)
-            momentum_score = calculate_momentum_score(beta or 0)
-            dividend_score = calculate_dividend_score(div_pct or 0)
-
-            if filters.get('strategy') == 'growth':
-                overall_score = (growth_score * 0.4 + pe_score * 0.3 + momentum_score * 0.3)
-            elif filters.get('strategy') == 'value':
-                overall_score = (value_score * 0.5 + dividend_score * 0.3 + pe_score * 0.2)
-            elif filters.get('strategy') == 'income':
-                overall_score = (dividend_score * 0.6 + value_score * 0.3 + pe_score * 0.1)
-            elif filters.get('strategy') == 'momentum':
-                overall_score = (momentum_score * 0.5 + growth_score * 0.3 + pe_score * 0.2)
-            else:
-                overall_score = (pe_score * 0.25 + growth_score * 0.25 + value_score * 0.20 + momentum_score * 0.15 + dividend_score * 0.15)
-
-            results.append({
-                'symbol': symbol,
-                'name': name,
-                'sector': sector,
-                'industry': industry,
-                'market_cap': market_cap,
-                'price': price,
-                'pe_ratio': pe_ratio,
-                'pb_ratio': pb_ratio,
-                'dividend_yield': div_pct,
-                'beta': beta,
-                'revenue_growth': None,
-                'overall_score': round(overall_score, 2),
-                'sector_pe_benchmark': sector_benchmark['average'],
-                'pe_score': pe_score,
-                'growth_score': growth_score,
-                'value_score': value_score,
-                'momentum_score': momentum_score,
-                'dividend_score': dividend_score
-            })
+            parsed.append((symbol, name, sector, industry, price, pe_ratio, pb_ratio, div_pct, beta, market_cap))
         except Exception as _e:
             continue
 
-    # Sort by overall score (descending) to get best stocks for the strategy
-    results.sort(key=lambda x: x['overall_score'] or 0, reverse=True)
+    # Pass 2: enrich with yfinance concurrently (each lookup is a blocking HTTP round-trip)
+    enriched: List[Optional[tuple]] = [None] * len(parsed)
+    if parsed:
+        executor = ThreadPoolExecutor(max_workers=min(YFINANCE_MAX_WORKERS, len(parsed)))
+        try:
+            futures = {
+                executor.submit(_enrich_with_yfinance, p[0], p[4], p[8], p[7]): i
+                for i, p in enumerate(parsed)
+            }
+            done, not_done = wait(futures, timeout=YFINANCE_ENRICH_TIMEOUT_SECONDS)
+            for future in done:
+                enriched[futures[future]] = future.result()
+            if not_done:
+                logger.warning(f"[yfinance] Enrichment timed out for {len(not_done)} symbols, using Finviz data")
+        finally:
+            # Don't hold the request on lookups that missed the deadline
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # Pass 3: merge enrichment back by position. Stocks stay as plain tuples (plus the
+    # score input table); result dicts are only built for the ones that make the cut.
+    stocks: List[tuple] = []
+    score_inputs: List[tuple] = []
+    for (symbol, name, sector, industry, price, pe_ratio, pb_ratio, div_pct, beta, market_cap), extra in zip(parsed, enriched):
+        revenue_growth = None
+        if extra is not None:
+            price, beta, div_pct, revenue_growth = extra
+
+        score_inputs.append((
+            pe_ratio or 0, pb_ratio or 0, revenue_growth or 0, beta or 0, div_pct or 0,
+            SECTOR_IDX.get(sector, len(SECTOR_IDX))
+        ))
+        stocks.append((symbol, name, sector, industry, market_cap, price, pe_ratio, pb_ratio, div_pct, beta))
+
+    if not stocks:
+        return []
+
+    # Compute scores for the whole batch at once
+    scores = score_stocks(np.array(score_inputs, dtype=SCORE_INPUT_DTYPE), filters.get('strategy'))
+    columns = {name: values.tolist() for name, values in scores.items()}
+    overall_scores = columns['overall_score']
+
+    # Rank by overall score (descending) to get best stocks for the strategy. Diversification
+    # may have to look past the top 10, so this is a full (stable, in-C) argsort rather than
+    # a top-k selection; ties keep Finviz order.
+    ranked = np.argsort(-scores['overall_score'], kind='stable').tolist()
     
     # Apply diversification: ensure we get stocks from different sectors
-    diversified_results = []
+    selected: List[int] = []
     sectors_seen = set()
     
     # First pass: get top stocks from different sectors
-    for stock in results:
-        if len(diversified_results) >= 10:
+    for i in ranked:
+        if len(selected) >= 10:
             break
-        if stock['sector'] not in sectors_seen or len(diversified_results) < 5:
-            diversified_results.append(stock)
-            sectors_seen.add(stock['sector'])
+        sector = stocks[i][2]
+        if sector not in sectors_seen or len(selected) < 5:
+            selected.append(i)
+            sectors_seen.add(sector)
     
     # Second pass: fill remaining slots with highest scores regardless of sector
-    for stock in results:
-        if len(diversified_results) >= 10:
+    picked = set(selected)
+    for i in ranked:
+        if len(selected) >= 10:
             break
-        if stock not in diversified_results:
-            diversified_results.append(stock)
+        if i not in picked:
+            selected.append(i)
+    
+    diversified_results = []
+    for i in selected:
+        symbol, name, sector, industry, market_cap, price, pe_ratio, pb_ratio, div_pct, beta = stocks[i]
+        stock = {
+            'symbol': symbol,
+            'name': name,
+            'sector': sector,
+            'industry': industry,
+            'market_cap': market_cap,
+            'price': price,
+            'pe_ratio': pe_ratio,
+            'pb_ratio': pb_ratio,
+            'dividend_yield': div_pct,
+            'beta': beta,
+            'revenue_growth': None,
+            'overall_score': overall_scores[i],
+            'sector_pe_benchmark': columns['sector_pe_benchmark'][i]
+        }
+        for score_name in ('pe_score', 'growth_score', 'value_score', 'momentum_score', 'dividend_score'):
+            stock[score_name] = columns[score_name][i]
+        diversified_results.append(stock)
     
     return diversified_results
 
+def _apply_post_filters(df: pd.DataFrame, price_max: Any, div_pref: Any) -> pd.DataFrame:
+    """Exact price cap and dividend checks as one combined boolean mask (single copy of the frame)"""
+    keep = pd.Series(True, index=df.index)
+    if price_max and 'Price' in df.columns:
+        keep &= df['Price'].astype(float) <= price_max
+    
+    if div_pref in ('low', 'moderate', 'high') and 'Dividend %' in df.columns:
+        keep &= df['Dividend %'].astype(str).str.rstrip('%').astype(float, errors='ignore') > 0
+    return df[keep]
+
+def _fetch_finviz_frame(finviz_filters_dict: Dict[str, str], limit: int) -> pd.DataFrame:
+    from finvizfinance.screener.overview import Overview  # type: ignore
+    screener = Overview()
+    # Finviz can handle empty dict {} to return all stocks, but NOT None
+    if finviz_filters_dict:
+        screener.set_filter(filters_dict=finviz_filters_dict)
+        logger.info(f"[Finviz] Filters set, calling screener_view...")
+    else:
+        logger.info(f"[Finviz] No filters, will return ALL stocks from Finviz...")
+    df: pd.DataFrame = screener.screener_view(limit=limit, verbose=0)
+    logger.info(f"[Finviz] ✅ Got DataFrame with {len(df)} rows")
+    return df
+
+def _get_finviz_frame(finviz_filters_dict: Dict[str, str], limit: int) -> pd.DataFrame:
+    """screener_view results through the TTL cache, coalescing concurrent identical fetches.
+    Callers must not modify the returned frame in place (it is shared).
+    """
+    key = (frozenset(finviz_filters_dict.items()), limit)
+    df = _finviz_cache.get(key)
+    if df is not None:
+        logger.info(f"[Finviz] Cache hit, {len(df)} rows")
+        return df
+
+    with _finviz_inflight_lock:
+        pending = _finviz_inflight.get(key)
+        owner = pending is None
+        if owner:
+            pending = _finviz_inflight[key] = Future()
+    if not owner:
+        logger.info(f"[Finviz] Waiting on in-flight fetch for the same filters")
+        return pending.result()
+
+    try:
+        df = _fetch_finviz_frame(finviz_filters_dict, limit)
+        _finviz_cache.put(key, df)
+        pending.set_result(df)
+        return df
+    except Exception as e:
+        pending.set_exception(e)
+        raise
+    finally:
+        with _finviz_inflight_lock:
+            del _finviz_inflight[key]
+
+def _enrich_with_yfinance(symbol: str, price: Optional[float], beta: Optional[float],
+                          div_pct: Optional[float]) -> tuple:
+    """Fill missing price/beta/dividend from yfinance and fetch revenue growth.
+    Returns (price, beta, div_pct, revenue_growth); lookup failures keep the inputs.
+    Only complete lookups are cached, so a transient Yahoo error is retried on the next screen.
+    """
+    # Blank Finviz fields arrive as NaN, which never equals itself; key them as None
+    cache_key = (symbol,) + tuple(None if v != v else v for v in (price, beta, div_pct))
+    cached = _yfinance_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    revenue_growth = None
+    complete = True
+    try:
+        import yfinance as yf
+        y = yf.Ticker(symbol)
+        info = y.fast_info if hasattr(y, 'fast_info') else {}
+        # Ticker.info is the slow full-quote endpoint; only hit it for fields Finviz didn't supply
+        y_info = (y.info or {}) if not beta or not div_pct else {}
+        
+        # Get missing price and beta
+        price = price or _to_float(getattr(info, 'last_price', None) or info.get('lastPrice'))
+        beta = beta or _to_float(y_info.get('beta'))
+        
+        # Get missing dividend yield
+        if not div_pct:
+            div_pct = _to_float(y_info.get('dividendYield'))
+            if div_pct:
+                div_pct = div_pct * 100  # Convert to percentage
+        
+        # Get revenue growth (5-year average)
+        try:
+            financials = y.financials
+            if not financials.empty and len(financials.columns) >= 2:
+                revenues = financials.loc['Total Revenue']
+                if len(revenues) >= 2:
+                    latest_revenue = revenues.iloc[0]
+                    prev_revenue = revenues.iloc[1]
+                    if latest_revenue and prev_revenue and prev_revenue != 0:
+                        revenue_growth = (latest_revenue - prev_revenue) / abs(prev_revenue)
+        except Exception:
+            complete = False
+            
+    except Exception:
+        complete = False
+    result = (price, beta, div_pct, revenue_growth)
+    if complete:
+        _yfinance_cache.put(cache_key, result)
+    return result
+
+@lru_cache(maxsize=64)
 def _map_sector_to_finviz_name(sector: str) -> Optional[str]:
     """Map our sector names to Finviz's exact sector filter values"""
     s = (sector or '').lower()
-    mapping = {
-        'technology': 'Technology',
-        'healthcare': 'Healthcare',
-        'consumer defensive': 'Consumer Defensive',
-        'communication services': 'Communication Services',
-        'consumer cyclical': 'Consumer Cyclical',
-        'real estate': 'Real Estate',
-        'industrials': 'Industrials',
-        'basic materials': 'Basic Materials',
-        'energy': 'Energy',
-        'financial services': 'Financial Services',
-        'financial': 'Financial'
-    }
     # Exact match first
-    if s in mapping:
-        return mapping[s]
+    if s in SECTOR_TO_FINVIZ:
+        return SECTOR_TO_FINVIZ[s]
     # Fallback fuzzy
-    for key, val in mapping.items():
+    for key, val in SECTOR_TO_FINVIZ.items():
         if key in s:
             return val
     return None
@@ -327,49 +616,53 @@ def _map_sector_to_finviz_name(sector: str) -> Optional[str]:
 def _to_float(x: Any) -> Optional[float]:
     if x is None:
         return None
-    try:
-        if isinstance(x, str):
-            x = x.replace('%', '').replace(',', '').strip()
+    if isinstance(x, (int, float)):
         return float(x)
-    except Exception:
-        return None
-
-def _parse_market_cap(x: Any) -> Optional[float]:
-    """Parse market cap from Finviz format (e.g., '1.2B', '500M', '2.5T')"""
-    if x is None:
-        return None
     try:
         if isinstance(x, str):
-            x = x.strip().upper()
-            if x.endswith('B'):
-                return float(x[:-1]) * 1_000_000_000
-            elif x.endswith('M'):
-                return float(x[:-1]) * 1_000_000
-            elif x.endswith('T'):
-                return float(x[:-1]) * 1_000_000_000_000
-            elif x.endswith('K'):
-                return float(x[:-1]) * 1_000
-            else:
-                # Try to parse as plain number
-                return float(x.replace(',', ''))
+            x = x.translate(NUMERIC_STRIP_TABLE).strip()
         return float(x)
     except Exception:
         return None
 
+def _column_values(df: pd.DataFrame, col: str, default: Any = None) -> List[Any]:
+    """Column as a plain list, or `default` for every row when the column is absent"""
+    if col not in df.columns:
+        return [default] * len(df)
+    return df[col].tolist()
+
+def _to_float_column(df: pd.DataFrame, col: str) -> List[Optional[float]]:
+    """_to_float over a whole column; numeric dtypes convert in one pass"""
+    if col not in df.columns:
+        return [None] * len(df)
+    series = df[col]
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float).tolist()
+    return [_to_float(x) for x in series.tolist()]
+
+def _parse_market_cap_column(df: pd.DataFrame, col: str) -> List[Optional[float]]:
+    """Parse a Finviz market cap column (e.g., '1.2B', '500M', '2.5T') with pandas string ops.
+    Plain numbers may contain thousands separators; unparseable values become NaN.
+    """
+    if col not in df.columns:
+        return [None] * len(df)
+    series = df[col]
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float).tolist()
+    s = series.astype(str).str.strip().str.upper()
+    suffix = s.str[-1:]
+    multiplier = suffix.map(MARKET_CAP_MULTIPLIERS)
+    number = s.str[:-1].where(multiplier.notna(), s.str.replace(',', '', regex=False))
+    values = pd.to_numeric(number, errors='coerce') * multiplier.fillna(1.0)
+    return values.tolist()
+
 def get_sector_pe_standards(sectors: List[str], strategy: str) -> Dict[str, float]:
     """Get P/E standards based on sectors and strategy"""
-    if not sectors:
-        # Default to overall market standards
-        return {'growth': 50, 'value': 20, 'average': 30}
-    
     # Use the most restrictive sector if multiple sectors
-    sector_standards = []
-    for sector in sectors:
-        if sector in SECTOR_PE_STANDARDS:
-            sector_standards.append(SECTOR_PE_STANDARDS[sector])
-    
+    sector_standards = [SECTOR_PE_STANDARDS[s] for s in sectors if s in SECTOR_PE_STANDARDS]
     if not sector_standards:
-        return {'growth': 50, 'value': 20, 'average': 30}
+        # Default to overall market standards
+        return dict(DEFAULT_SECTOR_PE_STANDARDS)
     
     # Return the most conservative (lowest) P/E ratios
     return {
@@ -378,89 +671,54 @@ def get_sector_pe_standards(sectors: List[str], strategy: str) -> Dict[str, floa
         'average': min(s['average'] for s in sector_standards)
     }
 
-def calculate_pe_score(pe_ratio: float, sector_average: float) -> float:
-    """Calculate P/E score relative to sector average"""
-    if not pe_ratio or pe_ratio <= 0:
-        return 50
-    
-    # Score based on how much below sector average
-    if pe_ratio < sector_average * 0.7:
-        return 90  # Significantly undervalued
-    elif pe_ratio < sector_average * 0.9:
-        return 75  # Moderately undervalued
-    elif pe_ratio < sector_average * 1.1:
-        return 60  # Fairly valued
-    elif pe_ratio < sector_average * 1.3:
-        return 40  # Moderately overvalued
-    else:
-        return 20  # Significantly overvalued
-
-def calculate_growth_score(revenue_growth: float) -> float:
-    """Calculate growth score"""
-    if not revenue_growth:
-        return 50
-    
+def score_stocks(stocks: np.ndarray, strategy: Optional[str]) -> Dict[str, np.ndarray]:
+    """Score a SCORE_INPUT_DTYPE batch of stocks (P/E, growth, value, momentum, dividend).
+    Returns one array per score plus overall_score (rounded to 2 dp) and the sector P/E benchmark.
+    """
+    pe_ratio = stocks['pe_ratio']
+    pb_ratio = stocks['pb_ratio']
+    revenue_growth = stocks['revenue_growth']
+    beta = stocks['beta']
+    dividend_yield = stocks['dividend_yield']
+    sector_idx = stocks['sector_idx']
+    sector_average = SECTOR_AVG_PE[sector_idx]
+
+    # P/E relative to sector average: count the sector's cut-offs the P/E is not below
+    # (bins differ per row, so this is a row-wise digitize; NaN lands in the last bin)
+    pe_bin = (~(pe_ratio[:, None] < SECTOR_PE_BINS[sector_idx])).sum(axis=1)
+    pe_score = np.where(pe_ratio <= 0, 50, PE_SCORES[pe_bin])
+
+    # '>' ladders digitize the negated value so NaN falls in the lowest band, as before
     growth_pct = revenue_growth * 100
-    if growth_pct > 20:
-        return 90
-    elif growth_pct > 15:
-        return 80
-    elif growth_pct > 10:
-        return 70
-    elif growth_pct > 5:
-        return 60
-    else:
-        return 40
+    growth_score = np.where(revenue_growth == 0, 50, GROWTH_SCORES[np.digitize(-growth_pct, GROWTH_PCT_BINS)])
 
-def calculate_value_score(pe_ratio: float, pb_ratio: float, sector_pe: Dict[str, float]) -> float:
-    """Calculate value score with sector awareness"""
-    pe_score = calculate_pe_score(pe_ratio, sector_pe['average']) if pe_ratio else 50
-    
-    pb_score = 50
-    if pb_ratio:
-        if pb_ratio < 1.0:
-            pb_score = 90
-        elif pb_ratio < 1.5:
-            pb_score = 75
-        elif pb_ratio < 2.0:
-            pb_score = 60
-        elif pb_ratio < 3.0:
-            pb_score = 40
-        else:
-            pb_score = 20
-    
-    return (pe_score + pb_score) / 2
+    pb_score = np.where(pb_ratio == 0, 50, PB_SCORES[np.digitize(pb_ratio, PB_BINS)])
+    value_score = (pe_score + pb_score) / 2
 
-def calculate_momentum_score(beta: float) -> float:
-    """Calculate momentum score based on beta"""
-    if not beta:
-        return 50
-    
-    # Moderate beta (0.8-1.2) gets highest score
-    if 0.8 <= beta <= 1.2:
-        return 80
-    elif 0.6 <= beta < 0.8 or 1.2 < beta <= 1.5:
-        return 70
-    elif 0.4 <= beta < 0.6 or 1.5 < beta <= 2.0:
-        return 60
-    else:
-        return 40
+    # Moderate beta (0.8-1.2) gets highest score, falling off on either side
+    momentum_score = np.select(
+        [beta == 0, beta < 0.8, beta <= 1.2, beta > 1.2],
+        [50, LOW_BETA_SCORES[np.digitize(beta, LOW_BETA_BINS)], 80,
+         HIGH_BETA_SCORES[np.digitize(beta, HIGH_BETA_BINS, right=True)]],
+        default=40
+    )
 
-def calculate_dividend_score(dividend_yield: float) -> float:
-    """Calculate dividend score"""
-    if not dividend_yield:
-        return 30
-    
-    if dividend_yield > 4:
-        return 90
-    elif dividend_yield > 3:
-        return 80
-    elif dividend_yield > 2:
-        return 70
-    elif dividend_yield > 1:
-        return 60
-    else:
-        return 40
+    dividend_score = np.where(dividend_yield == 0, 30, DIVIDEND_SCORES[np.digitize(-dividend_yield, DIVIDEND_BINS)])
+
+    # Unknown strategies score as balanced
+    weights = STRATEGY_WEIGHTS.get(strategy, STRATEGY_WEIGHTS['balanced'])
+    components = np.stack([pe_score, growth_score, value_score, momentum_score, dividend_score])
+    overall_score = np.round(weights @ components, 2)
+
+    return {
+        'overall_score': overall_score,
+        'sector_pe_benchmark': sector_average,
+        'pe_score': pe_score,
+        'growth_score': growth_score,
+        'value_score': value_score,
+        'momentum_score': momentum_score,
+        'dividend_score': dividend_score
+    }
 
 def get_sector_adjustments(filters: Dict[str, Any]) -> Dict[str, Any]:
     """Get sector-specific adjustments applied"""
@@ -483,8 +741,12 @@ def health_check():
         'status': 'healthy',
         'service': 'python-screener',
         'sector_standards': len(SECTOR_PE_STANDARDS),
-        'timestamp': pd.Timestamp.now().isoformat()
+        'timestamp': datetime.now().isoformat()
     })
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8080, debug=True)
+    # Local development only: containers serve main:app through gunicorn (see Dockerfile).
+    # Set FLASK_DEBUG=1 for the reloader/debugger.
+    import os
+    port = int(os.environ.get('PORT', 8080))
+    app.run(host='0.0.0.0', port=port, debug=bool(os.environ.get('FLASK_DEBUG')))
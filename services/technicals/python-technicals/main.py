@@ -12,12 +12,21 @@ Provides comprehensive technical analysis including:
 """
 
 import logging
+import math
+import os
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from typing import Dict, Any, List, Optional, Tuple
 import pandas as pd
 import numpy as np
+import requests
 from datetime import datetime
+import threading
+import time
 import traceback
+import zlib
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
 try:
     import yfinance as yf
@@ -26,10 +35,191 @@ except ImportError:
     YFINANCE_AVAILABLE = False
     logging.warning("yfinance not available")
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import requests_cache
+    REQUESTS_CACHE_AVAILABLE = True
+except ImportError:
+    REQUESTS_CACHE_AVAILABLE = False
+
+try:
+    from flask_compress import Compress
+    FLASK_COMPRESS_AVAILABLE = True
+except ImportError:
+    FLASK_COMPRESS_AVAILABLE = False
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in so jitted kernels stay importable (and testable) without numba"""
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+if ORJSON_AVAILABLE:
+    class OrjsonProvider(DefaultJSONProvider):
+        """Serialize jsonify() responses with orjson (NumPy-aware; NaN/inf become null)."""
+
+        def _dumps_bytes(self, obj: Any) -> bytes:
+            return orjson.dumps(
+                obj, default=self.default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            )
+
+        def dumps(self, obj: Any, **kwargs: Any) -> str:
+            return self._dumps_bytes(obj).decode()
+
+        def response(self, *args: Any, **kwargs: Any) -> Any:
+            # Hand orjson's bytes straight to the response (no str decode/re-encode round-trip)
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(self._dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+        def loads(self, s: Any, **kwargs: Any) -> Any:
+            return orjson.loads(s)
+
+    app.json = OrjsonProvider(app)
+
+if FLASK_COMPRESS_AVAILABLE:
+    # Compress JSON bodies over 1 KB (brotli when the client accepts it, else gzip).
+    # Gunicorn never encodes responses itself, so this is the only compression layer.
+    app.config['COMPRESS_MIN_SIZE'] = 1024
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    Compress(app)
+
+
+class _TTLCache:
+    """Process-local, thread-safe cache whose entries expire after `ttl` seconds.
+    When full, expired entries are dropped first, then the oldest insertions.
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: Dict[Any, tuple] = {}  # {key: (expires_at, value)}
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any:
+        """Return the cached value, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def put(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.maxsize:
+                for k in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+                    del self._entries[k]
+                while len(self._entries) >= self.maxsize:
+                    del self._entries[next(iter(self._entries))]
+            self._entries[key] = (now + (self.ttl if ttl is None else ttl), value)
+
+# yfinance OHLCV frames keyed by (ticker, period, interval); intraday bars go stale faster.
+# Cached frames are shared between requests and must be treated as read-only.
+OHLCV_CACHE_TTL_SECONDS = 3600
+OHLCV_INTRADAY_CACHE_TTL_SECONDS = 60
+_ohlcv_cache = _TTLCache(OHLCV_CACHE_TTL_SECONDS, 512)
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Yahoo chart endpoint queried directly before falling back to yfinance
+YAHOO_CHART_URL = 'https://query1.finance.yahoo.com/v8/finance/chart/{ticker}'
+YAHOO_CHART_TIMEOUT_SECONDS = 10
+YAHOO_CHART_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+# Chart API responses are also kept in an on-disk SQLite cache shared by all gunicorn
+# workers (point YAHOO_HTTP_CACHE_PATH at a volume to keep it across restarts). WAL mode
+# and a busy timeout let the workers read and write it concurrently.
+YAHOO_HTTP_CACHE_PATH = os.environ.get('YAHOO_HTTP_CACHE_PATH', '/tmp/yahoo_http_cache')
+YAHOO_HTTP_CACHE_BUSY_TIMEOUT_MS = 5000
+
+# Opened on first use in each worker, never at import: with --preload the master would
+# otherwise hold the SQLite connection across fork, and the image build would bake the file in
+_yahoo_session: Optional[requests.Session] = None
+_yahoo_session_lock = threading.Lock()
+
+
+def _get_yahoo_session() -> requests.Session:
+    """This process's chart API session (SQLite-cached when requests-cache is installed)"""
+    global _yahoo_session
+    if _yahoo_session is None:
+        with _yahoo_session_lock:
+            if _yahoo_session is None:
+                if REQUESTS_CACHE_AVAILABLE:
+                    _yahoo_session = requests_cache.CachedSession(
+                        YAHOO_HTTP_CACHE_PATH, backend='sqlite', expire_after=OHLCV_CACHE_TTL_SECONDS,
+                        wal=True, busy_timeout=YAHOO_HTTP_CACHE_BUSY_TIMEOUT_MS
+                    )
+                else:
+                    _yahoo_session = requests.Session()
+    return _yahoo_session
+
+# SMA/EMA lookbacks reported by calculate_indicators
+MA_WINDOWS = (20, 50, 200)
+
+# Bars scanned for the pivot-point high/low and the Fibonacci swing high/low
+PIVOT_LOOKBACK = 20
+FIBONACCI_LOOKBACK = 50
+
+# Interior Fibonacci retracement ratios and their response keys
+FIBONACCI_RATIOS = np.array([0.236, 0.382, 0.5, 0.618, 0.786])
+FIBONACCI_LABELS = ('23.6', '38.2', '50.0', '61.8', '78.6')
+
+# Labels for the pivot levels, ordered R3, R2, R1, P, S1, S2, S3
+PIVOT_LEVEL_TYPES = ('resistance',) * 3 + ('pivot',) + ('support',) * 3
+PIVOT_LEVEL_STRENGTHS = ('strong', 'moderate', 'weak', 'neutral', 'weak', 'moderate', 'strong')
+
+# Indicator/regime/level results keyed by the identity of the OHLCV frame they came from
+_analysis_cache = _TTLCache(OHLCV_CACHE_TTL_SECONDS, 256)
+
+# Complete analyze_ticker() payloads (including short interest) keyed by (ticker, period, interval)
+RESULT_CACHE_TTL_SECONDS = 900
+RESULT_INTRADAY_CACHE_TTL_SECONDS = 60
+_result_cache = _TTLCache(RESULT_CACHE_TTL_SECONDS, 512)
+
+# Short interest (% of float) tier boundaries, ascending, and the (warning_level, message)
+# for each tier: below 5%, 5-10%, 10-20%, 20-40%, 40% and above
+SHORT_INTEREST_THRESHOLDS = (5, 10, 20, 40)
+SHORT_INTEREST_TIERS = (
+    ('none', 'Short interest at {pct:.1f}% is normal'),
+    ('low', 'Low short interest ({pct:.1f}% of float) - Minimal shorting pressure.'),
+    ('caution', 'Elevated short interest ({pct:.1f}% of float) - Moderate shorting pressure.'),
+    ('warning', '⚠️ HIGH SHORT INTEREST ({pct:.1f}% of float) - Significant institutional shorting. Exercise caution.'),
+    ('danger', '⚠️ EXTREME SHORT INTEREST ({pct:.1f}% of float) - Institutions heavily shorting. High risk of catching falling knife.'),
+)
+
+# yfinance Ticker.info payloads (read for short interest) keyed by ticker
+TICKER_INFO_CACHE_TTL_SECONDS = 86400
+_ticker_info_cache = _TTLCache(TICKER_INFO_CACHE_TTL_SECONDS, 1024)
+
+# /analyze_batch: tickers accepted per request and concurrent per-ticker analyses
+# (each is mostly yfinance/Yahoo I/O, so threads overlap the waits)
+MAX_BATCH_TICKERS = 50
+BATCH_MAX_WORKERS = 16
+INSUFFICIENT_DATA_ERROR = 'Insufficient data for technical analysis (need at least 50 bars)'
+
+# Short interest is fetched on a shared I/O pool while the OHLCV fetch runs; once the bars
+# are in, the response waits at most SHORT_INTEREST_TIMEOUT_SECONDS more for it
+IO_MAX_WORKERS = 16
+SHORT_INTEREST_TIMEOUT_SECONDS = 10
+_io_pool = ThreadPoolExecutor(max_workers=IO_MAX_WORKERS)
+
 
 @app.route('/', methods=['GET'])
 def root():
@@ -41,7 +231,8 @@ def root():
         'description': 'Technical analysis service with indicators, regime detection, levels, and short interest warnings',
         'endpoints': {
             'health': '/health',
-            'analyze': '/analyze (POST)'
+            'analyze': '/analyze (POST)',
+            'analyze_batch': '/analyze_batch (POST)'
         },
         'timestamp': datetime.now().isoformat()
     })
@@ -64,6 +255,7 @@ def analyze():
     
     Request: {"ticker": "AAPL", "period": "1y", "interval": "1d"}
     Response: Complete technical analysis with indicators, regime, and levels
+    Query: ?nocache=1 recomputes instead of serving a cached result
     """
     try:
         data = request.json
@@ -76,56 +268,19 @@ def analyze():
         
         logger.info(f"Analyzing {ticker} ({period}, {interval})")
         
-        # Fetch OHLCV data
-        df = fetch_ohlcv(ticker, period, interval)
+        now_iso = datetime.now().isoformat()
+        result = analyze_ticker(ticker, period, interval, request.args.get('nocache') != '1', now_iso)
         
-        if df is None or len(df) < 50:
+        if result is None:
             return jsonify({
                 'success': False,
-                'error': 'Insufficient data for technical analysis (need at least 50 bars)'
+                'error': INSUFFICIENT_DATA_ERROR
             }), 400
         
-        # Calculate all indicators
-        indicators = calculate_indicators(df)
-        
-        # Detect market regime
-        regime = detect_market_regime(df, indicators)
-        
-        # Calculate support/resistance levels
-        levels = calculate_support_resistance(df)
-        
-        # Calculate Fibonacci levels
-        fibonacci = calculate_fibonacci_levels(df)
-        
-        # Get short interest data (institutional shorting warning)
-        short_interest = get_short_interest(ticker)
-        
-        # Determine bias and confidence
-        bias, confidence = determine_bias(indicators, regime)
-        
-        # Get current values
-        current_price = float(df['Close'].iloc[-1])
-        
-        result = {
-            'ticker': ticker,
-            'current_price': current_price,
-            'bias': bias,
-            'confidence': confidence,
-            'indicators': indicators,
-            'regime': regime,
-            'levels': {
-                'support_resistance': levels,
-                'fibonacci': fibonacci
-            },
-            'short_interest': short_interest,
-            'summary': generate_summary(bias, confidence, regime, current_price, levels),
-            'timestamp': datetime.now().isoformat()
-        }
-        
         return jsonify({
             'success': True,
             'data': result,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now_iso
         })
         
     except Exception as e:
@@ -138,12 +293,210 @@ def analyze():
         }), 500
 
 
+@app.route('/analyze_batch', methods=['POST'])
+def analyze_batch():
+    """
+    Run /analyze for several tickers in one request, concurrently
+    
+    Request: {"tickers": ["AAPL", "MSFT"], "period": "1y", "interval": "1d"}
+    Response: {"data": {ticker: analysis}, "errors": {ticker: message}}
+    """
+    try:
+        data = request.json
+        raw_tickers = data.get('tickers', [])
+        if not isinstance(raw_tickers, list) or not all(isinstance(t, str) for t in raw_tickers):
+            return jsonify({'success': False, 'error': 'tickers must be a list of strings'}), 400
+        tickers = list(dict.fromkeys(t.upper() for t in raw_tickers if t))
+        period = data.get('period', '1y')
+        interval = data.get('interval', '1d')
+        use_cache = request.args.get('nocache') != '1'
+        now_iso = datetime.now().isoformat()
+        
+        if not tickers:
+            return jsonify({'success': False, 'error': 'Tickers required'}), 400
+        if len(tickers) > MAX_BATCH_TICKERS:
+            return jsonify({
+                'success': False,
+                'error': f'At most {MAX_BATCH_TICKERS} tickers per batch'
+            }), 400
+        
+        logger.info(f"Batch analyzing {len(tickers)} tickers ({period}, {interval})")
+        
+        def run(ticker: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+            try:
+                result = analyze_ticker(ticker, period, interval, use_cache, now_iso)
+                return (result, None) if result is not None else (None, INSUFFICIENT_DATA_ERROR)
+            except Exception as e:
+                logger.error(f"Technical analysis error for {ticker}: {str(e)}")
+                return None, str(e)
+        
+        with ThreadPoolExecutor(max_workers=min(BATCH_MAX_WORKERS, len(tickers))) as executor:
+            outcomes = list(executor.map(run, tickers))
+        
+        results = {}
+        errors = {}
+        for ticker, (result, error) in zip(tickers, outcomes):
+            if result is not None:
+                results[ticker] = result
+            else:
+                errors[ticker] = error
+        
+        return jsonify({
+            'success': bool(results),
+            'data': results,
+            'errors': errors,
+            'timestamp': now_iso
+        })
+        
+    except Exception as e:
+        logger.error(f"Batch technical analysis error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'traceback': traceback.format_exc() if app.debug else None
+        }), 500
+
+
+def analyze_ticker(
+    ticker: str, period: str, interval: str, use_cache: bool = True, timestamp: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Fetch, analyze and summarize one ticker. Results are cached for a short
+    TTL (shorter for intraday intervals); cached payloads are shared and
+    must not be mutated.
+    
+    Args:
+        timestamp: ISO timestamp to stamp a freshly computed result with (the
+            caller's request time); defaults to now. Cached results keep theirs.
+    
+    Returns:
+        The /analyze result payload, or None when there are fewer than 50 bars
+    """
+    cache_key = (ticker, period, interval)
+    if use_cache:
+        cached = _result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    # Get short interest data (institutional shorting warning) in the background
+    short_interest_future = _io_pool.submit(get_short_interest, ticker)
+    
+    # Fetch OHLCV data
+    df = fetch_ohlcv(ticker, period, interval)
+    
+    if df is None or len(df) < 50:
+        short_interest_future.cancel()
+        return None
+    
+    indicators, regime, levels, fibonacci, bias, confidence = analyze_ohlcv(ticker, interval, df)
+    
+    try:
+        short_interest = short_interest_future.result(timeout=SHORT_INTEREST_TIMEOUT_SECONDS)
+        short_interest_complete = True
+    except FutureTimeoutError:
+        logger.warning(f"Short interest for {ticker} timed out, responding without it")
+        short_interest = {
+            'available': False,
+            'warning_level': 'unknown',
+            'warning_message': 'Short interest data temporarily unavailable'
+        }
+        short_interest_complete = False
+    
+    # Get current values
+    current_price = fibonacci['current_price']
+    
+    result = {
+        'ticker': ticker,
+        'current_price': current_price,
+        'bias': bias,
+        'confidence': confidence,
+        'indicators': indicators,
+        'regime': regime,
+        'levels': {
+            'support_resistance': levels,
+            'fibonacci': fibonacci
+        },
+        'short_interest': short_interest,
+        'summary': generate_summary(bias, confidence, regime, current_price, levels),
+        'timestamp': timestamp or datetime.now().isoformat()
+    }
+    
+    # A timed-out short interest lookup should not be served from cache for the full TTL
+    if short_interest_complete:
+        intraday = interval.endswith(('m', 'h'))
+        _result_cache.put(cache_key, result, RESULT_INTRADAY_CACHE_TTL_SECONDS if intraday else None)
+    return result
+
+
+def analyze_ohlcv(ticker: str, interval: str, df: pd.DataFrame) -> Tuple:
+    """
+    Run the pure indicator pipeline on an OHLCV frame, memoized by the frame's
+    shape and last bar so repeat requests on a cached frame skip the pandas work.
+    
+    Returns:
+        (indicators, regime, levels, fibonacci, bias, confidence)
+    """
+    # Pull each column out of pandas once; every step below works on float64 ndarrays
+    high = df['High'].to_numpy(dtype=np.float64)
+    low = df['Low'].to_numpy(dtype=np.float64)
+    close = df['Close'].to_numpy(dtype=np.float64)
+    
+    cache_key = (ticker, interval, len(df), df.index[-1], float(close[-1]))
+    cached = _analysis_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    # Calculate all indicators
+    indicators = calculate_indicators(high, low, close)
+    
+    # Detect market regime
+    regime = detect_market_regime(close, indicators)
+    
+    # Recent extremes shared by the pivot and Fibonacci levels; the 50-bar window
+    # reuses the 20-bar result and only scans the 30 bars before it
+    current_price = float(close[-1])
+    recent_high = float(high[-PIVOT_LOOKBACK:].max())
+    recent_low = float(low[-PIVOT_LOOKBACK:].min())
+    older_high = high[-FIBONACCI_LOOKBACK:-PIVOT_LOOKBACK]
+    older_low = low[-FIBONACCI_LOOKBACK:-PIVOT_LOOKBACK]
+    swing_high = max(recent_high, float(older_high.max())) if older_high.size else recent_high
+    swing_low = min(recent_low, float(older_low.min())) if older_low.size else recent_low
+    
+    # Calculate support/resistance levels
+    levels = calculate_support_resistance(recent_high, recent_low, current_price)
+    
+    # Calculate Fibonacci levels
+    fibonacci = calculate_fibonacci_levels(swing_high, swing_low, current_price)
+    
+    # Determine bias and confidence
+    bias, confidence = determine_bias(indicators, regime)
+    
+    result = (indicators, regime, levels, fibonacci, bias, confidence)
+    _analysis_cache.put(cache_key, result)
+    return result
+
+
 def fetch_ohlcv(ticker: str, period: str = '1y', interval: str = '1d') -> Optional[pd.DataFrame]:
     """Fetch OHLCV data from yfinance with retry logic"""
     if not YFINANCE_AVAILABLE:
         return get_mock_ohlcv(ticker)
     
-    import time
+    cache_key = (ticker, period, interval)
+    cached = _ohlcv_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    intraday = interval.endswith(('m', 'h'))
+    ttl = OHLCV_INTRADAY_CACHE_TTL_SECONDS if intraday else OHLCV_CACHE_TTL_SECONDS
+    
+    # Intraday chart responses carry no adjusted close, so those go straight to yfinance
+    df = None if intraday else fetch_yahoo_chart(ticker, period, interval, ttl)
+    if df is not None:
+        logger.info(f"Fetched {len(df)} bars for {ticker} from chart API")
+        _ohlcv_cache.put(cache_key, df, ttl)
+        return df
+    
     max_retries = 3
     
     for attempt in range(max_retries):
@@ -161,6 +514,10 @@ def fetch_ohlcv(ticker: str, period: str = '1y', interval: str = '1d') -> Option
                 return get_mock_ohlcv(ticker)
             
             logger.info(f"Fetched {len(df)} bars for {ticker}")
+            # Keep only the price/volume columns (yfinance adds dividends and splits)
+            df = df[OHLCV_COLUMNS]
+            # Only live data is cached; the mock fallbacks are cheap to regenerate
+            _ohlcv_cache.put(cache_key, df, ttl)
             return df
             
         except Exception as e:
@@ -172,6 +529,56 @@ def fetch_ohlcv(ticker: str, period: str = '1y', interval: str = '1d') -> Option
             return get_mock_ohlcv(ticker)
 
 
+def fetch_yahoo_chart(ticker: str, period: str, interval: str, ttl: float) -> Optional[pd.DataFrame]:
+    """
+    Fetch OHLCV bars straight from Yahoo's chart API, skipping yfinance's
+    scraping and frame post-processing. Bars are dividend/split adjusted like
+    yfinance's auto_adjust; returns None when Yahoo sends no adjusted close
+    (intraday ranges) or on any failure, so the caller falls back to yfinance.
+    `ttl` bounds the age of an HTTP-cached response.
+    """
+    try:
+        cache_kwargs = {'expire_after': ttl} if REQUESTS_CACHE_AVAILABLE else {}
+        response = _get_yahoo_session().get(
+            YAHOO_CHART_URL.format(ticker=ticker),
+            params={'range': period, 'interval': interval},
+            headers=YAHOO_CHART_HEADERS,
+            timeout=YAHOO_CHART_TIMEOUT_SECONDS,
+            **cache_kwargs
+        )
+        response.raise_for_status()
+        result = response.json()['chart']['result'][0]
+        quote = result['indicators']['quote'][0]
+        adjclose = result['indicators'].get('adjclose')
+        if not adjclose:
+            return None
+        
+        # Missing bars come back as null; np.asarray turns them into NaN
+        columns = {
+            name.title(): np.asarray(quote[name], dtype=np.float64)
+            for name in ('open', 'high', 'low', 'close', 'volume')
+        }
+        
+        # Scale OHLC by adjclose / close, as auto_adjust does (volume stays raw)
+        adjusted_close = np.asarray(adjclose[0]['adjclose'], dtype=np.float64)
+        ratio = adjusted_close / columns['Close']
+        for name in ('Open', 'High', 'Low'):
+            columns[name] *= ratio
+        columns['Close'] = adjusted_close
+        index = pd.to_datetime(np.asarray(result['timestamp'], dtype=np.int64), unit='s', utc=True)
+        timezone = result.get('meta', {}).get('exchangeTimezoneName')
+        if timezone:
+            index = index.tz_convert(timezone)
+        
+        df = pd.DataFrame(columns, index=index)
+        df = df[~np.isnan(columns['Close'])]
+        return df if not df.empty else None
+        
+    except Exception as e:
+        logger.warning(f"Chart API error for {ticker}: {e}, falling back to yfinance")
+        return None
+
+
 def get_short_interest(ticker: str) -> Dict[str, Any]:
     """
     Get short interest data to warn about institutional shorting
@@ -190,34 +597,38 @@ def get_short_interest(ticker: str) -> Dict[str, Any]:
             'warning_message': 'Short interest data unavailable'
         }
     
-    import time
-    max_retries = 2
-    
-    for attempt in range(max_retries):
-        try:
-            # yfinance 0.2.66+ uses curl_cffi internally, no need for custom session
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            
-            # Check if info is empty or invalid
-            if not info or not isinstance(info, dict):
+    # Short interest is reported twice a month, so the info payload can be reused for a day
+    info = _ticker_info_cache.get(ticker)
+    if info is None:
+        max_retries = 2
+        
+        for attempt in range(max_retries):
+            try:
+                # yfinance 0.2.66+ uses curl_cffi internally, no need for custom session
+                stock = yf.Ticker(ticker)
+                info = stock.info
+                
+                # Check if info is empty or invalid
+                if not info or not isinstance(info, dict):
+                    if attempt < max_retries - 1:
+                        time.sleep(1)
+                        continue
+                    raise ValueError("No valid data returned")
+                
+                break  # Success, exit retry loop
+                
+            except Exception as e:
                 if attempt < max_retries - 1:
                     time.sleep(1)
                     continue
-                raise ValueError("No valid data returned")
-            
-            break  # Success, exit retry loop
-            
-        except Exception as e:
-            if attempt < max_retries - 1:
-                time.sleep(1)
-                continue
-            logger.error(f"Short interest fetch error for {ticker}: {e}")
-            return {
-                'available': False,
-                'warning_level': 'unknown',
-                'warning_message': 'Short interest data temporarily unavailable'
-            }
+                logger.error(f"Short interest fetch error for {ticker}: {e}")
+                return {
+                    'available': False,
+                    'warning_level': 'unknown',
+                    'warning_message': 'Short interest data temporarily unavailable'
+                }
+        
+        _ticker_info_cache.put(ticker, info)
     
     try:
         
@@ -249,21 +660,9 @@ def get_short_interest(ticker: str) -> Dict[str, Any]:
                 short_trend = 'decreasing'
         
         # Determine warning level based on thresholds
-        warning_level = 'none'
-        warning_message = f'Short interest at {short_pct_float:.1f}% is normal'
-        
-        if short_pct_float >= 40:
-            warning_level = 'danger'
-            warning_message = f'⚠️ EXTREME SHORT INTEREST ({short_pct_float:.1f}% of float) - Institutions heavily shorting. High risk of catching falling knife.'
-        elif short_pct_float >= 20:
-            warning_level = 'warning'
-            warning_message = f'⚠️ HIGH SHORT INTEREST ({short_pct_float:.1f}% of float) - Significant institutional shorting. Exercise caution.'
-        elif short_pct_float >= 10:
-            warning_level = 'caution'
-            warning_message = f'Elevated short interest ({short_pct_float:.1f}% of float) - Moderate shorting pressure.'
-        elif short_pct_float >= 5:
-            warning_level = 'low'
-            warning_message = f'Low short interest ({short_pct_float:.1f}% of float) - Minimal shorting pressure.'
+        tier = bisect_right(SHORT_INTEREST_THRESHOLDS, short_pct_float)
+        warning_level, message_template = SHORT_INTEREST_TIERS[tier]
+        warning_message = message_template.format(pct=short_pct_float)
         
         # Add days to cover context
         if short_ratio is not None and short_ratio > 0:
@@ -290,11 +689,11 @@ def get_short_interest(ticker: str) -> Dict[str, Any]:
             'warning_level': warning_level,
             'warning_message': warning_message,
             'interpretation': {
-                'danger': short_pct_float >= 40,
-                'high': short_pct_float >= 20,
-                'moderate': short_pct_float >= 10,
-                'low': short_pct_float >= 5,
-                'minimal': short_pct_float < 5
+                'danger': tier >= 4,
+                'high': tier >= 3,
+                'moderate': tier >= 2,
+                'low': tier >= 1,
+                'minimal': tier == 0
             }
         }
         
@@ -307,67 +706,70 @@ def get_short_interest(ticker: str) -> Dict[str, Any]:
         }
 
 
-def calculate_indicators(df: pd.DataFrame) -> Dict[str, Any]:
+def calculate_indicators(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> Dict[str, Any]:
     """Calculate all technical indicators"""
     
-    close = df['Close']
-    high = df['High']
-    low = df['Low']
-    volume = df['Volume']
-    
-    # Moving Averages
-    sma_20 = close.rolling(window=20).mean()
-    sma_50 = close.rolling(window=50).mean()
-    sma_200 = close.rolling(window=200).mean()
-    
-    ema_20 = close.ewm(span=20, adjust=False).mean()
-    ema_50 = close.ewm(span=50, adjust=False).mean()
-    ema_200 = close.ewm(span=200, adjust=False).mean()
-    
-    # RSI (14-period)
-    rsi = calculate_rsi(close, 14)
-    
-    # MACD
-    macd_line, signal_line, histogram = calculate_macd(close)
-    
-    # ADX (trend strength)
-    adx = calculate_adx(high, low, close, 14)
-    
-    # ATR (volatility)
-    atr = calculate_atr(high, low, close, 14)
-    
-    # 52-week percentile
-    percentile_52w = calculate_52w_percentile(close)
+    if NUMBA_AVAILABLE:
+        # One compiled pass producing every latest value
+        (sma_20, sma_50, sma_200, ema_20, ema_50, ema_200, rsi_last, macd_line, signal_line,
+         histogram, adx_last, atr_last, percentile_52w) = _indicators_last(
+            np.ascontiguousarray(close), np.ascontiguousarray(high), np.ascontiguousarray(low))
+    else:
+        # Moving Averages (only the latest values are reported)
+        sma_20, sma_50, sma_200 = (
+            float(close[-window:].mean()) if len(close) >= window else np.nan
+            for window in MA_WINDOWS
+        )
+        ema_20, ema_50, ema_200 = ema_last(close, MA_WINDOWS).tolist()
+        
+        # RSI (14-period)
+        rsi_last = calculate_rsi(close, 14)[-1]
+        
+        # MACD
+        macd_line, signal_line, histogram = calculate_macd(close)
+        
+        # ATR (volatility)
+        atr = calculate_atr(high, low, close, 14)
+        atr_last = atr[-1]
+        
+        # ADX (trend strength), reusing the ATR instead of rebuilding the true range
+        adx_last = calculate_adx(high, low, close, 14, atr=atr)[-1]
+        
+        # 52-week percentile
+        percentile_52w = calculate_52w_percentile(close)
     
     # Current values
-    current_price = float(close.iloc[-1])
+    current_price = float(close[-1])
+    rsi_value = _value_or(rsi_last, 50.0)
+    adx_value = _value_or(adx_last, 20.0)
+    atr_value = _value_or(atr_last, 0.0)
     
     indicators = {
         'moving_averages': {
-            'sma_20': float(sma_20.iloc[-1]) if not pd.isna(sma_20.iloc[-1]) else None,
-            'sma_50': float(sma_50.iloc[-1]) if not pd.isna(sma_50.iloc[-1]) else None,
-            'sma_200': float(sma_200.iloc[-1]) if not pd.isna(sma_200.iloc[-1]) else None,
-            'ema_20': float(ema_20.iloc[-1]) if not pd.isna(ema_20.iloc[-1]) else None,
-            'ema_50': float(ema_50.iloc[-1]) if not pd.isna(ema_50.iloc[-1]) else None,
-            'ema_200': float(ema_200.iloc[-1]) if not pd.isna(ema_200.iloc[-1]) else None,
+            'sma_20': _value_or(sma_20, None),
+            'sma_50': _value_or(sma_50, None),
+            'sma_200': _value_or(sma_200, None),
+            'ema_20': _value_or(ema_20, None),
+            'ema_50': _value_or(ema_50, None),
+            'ema_200': _value_or(ema_200, None),
         },
         'rsi': {
-            'value': float(rsi.iloc[-1]) if not pd.isna(rsi.iloc[-1]) else 50.0,
-            'interpretation': interpret_rsi(rsi.iloc[-1] if not pd.isna(rsi.iloc[-1]) else 50.0)
+            'value': rsi_value,
+            'interpretation': interpret_rsi(rsi_value)
         },
         'macd': {
-            'macd_line': float(macd_line.iloc[-1]) if not pd.isna(macd_line.iloc[-1]) else 0.0,
-            'signal_line': float(signal_line.iloc[-1]) if not pd.isna(signal_line.iloc[-1]) else 0.0,
-            'histogram': float(histogram.iloc[-1]) if not pd.isna(histogram.iloc[-1]) else 0.0,
-            'signal': 'bullish' if histogram.iloc[-1] > 0 else 'bearish' if histogram.iloc[-1] < 0 else 'neutral'
+            'macd_line': _value_or(macd_line, 0.0),
+            'signal_line': _value_or(signal_line, 0.0),
+            'histogram': _value_or(histogram, 0.0),
+            'signal': 'bullish' if histogram > 0 else 'bearish' if histogram < 0 else 'neutral'
         },
         'adx': {
-            'value': float(adx.iloc[-1]) if not pd.isna(adx.iloc[-1]) else 20.0,
-            'trend_strength': interpret_adx(adx.iloc[-1] if not pd.isna(adx.iloc[-1]) else 20.0)
+            'value': adx_value,
+            'trend_strength': interpret_adx(adx_value)
         },
         'atr': {
-            'value': float(atr.iloc[-1]) if not pd.isna(atr.iloc[-1]) else 0.0,
-            'volatility_pct': float((atr.iloc[-1] / current_price) * 100) if not pd.isna(atr.iloc[-1]) else 0.0
+            'value': atr_value,
+            'volatility_pct': (atr_value / current_price) * 100
         },
         'percentile_52w': percentile_52w
     }
@@ -375,102 +777,278 @@ def calculate_indicators(df: pd.DataFrame) -> Dict[str, Any]:
     return indicators
 
 
-def calculate_rsi(prices: pd.Series, period: int = 14) -> pd.Series:
-    """Calculate Relative Strength Index"""
-    delta = prices.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+@njit(cache=True)
+def _indicators_last(close, high, low, period=14, fast=12, slow=26, signal=9):
+    """
+    Latest value of every indicator in calculate_indicators, in a single loop over the bars.
+    
+    Mirrors the NumPy path: trailing-window SMAs, adjust=False EMAs, Wilder-smoothed
+    RSI/ATR/ADX and the 52-week percentile. NaN marks values without enough history.
+    
+    Returns:
+        (sma_20, sma_50, sma_200, ema_20, ema_50, ema_200, rsi, macd, macd_signal,
+         macd_histogram, adx, atr, percentile_52w)
+    """
+    n = close.shape[0]
+    a20, a50, a200 = 2.0 / 21.0, 2.0 / 51.0, 2.0 / 201.0
+    a_fast, a_slow, a_signal = 2.0 / (fast + 1.0), 2.0 / (slow + 1.0), 2.0 / (signal + 1.0)
+    
+    ema20 = ema50 = ema200 = ema_fast = ema_slow = close[0]
+    macd_signal = 0.0
+    avg_gain = avg_loss = 0.0
+    atr = plus_dm_avg = minus_dm_avg = adx = 0.0
+    adx_weight = 1.0
+    rsi = dx = np.nan
+    
+    for i in range(n):
+        c = close[i]
+        
+        # EMAs and MACD
+        if i > 0:
+            ema20 = a20 * c + (1.0 - a20) * ema20
+            ema50 = a50 * c + (1.0 - a50) * ema50
+            ema200 = a200 * c + (1.0 - a200) * ema200
+            ema_fast = a_fast * c + (1.0 - a_fast) * ema_fast
+            ema_slow = a_slow * c + (1.0 - a_slow) * ema_slow
+            macd_signal = a_signal * (ema_fast - ema_slow) + (1.0 - a_signal) * macd_signal
+        
+        # RSI: Wilder averages of the close-to-close gains/losses, seeded over deltas 1..period
+        if i > 0:
+            delta = c - close[i - 1]
+            gain = delta if delta > 0.0 else 0.0
+            loss = -delta if delta < 0.0 else 0.0
+            if i <= period:
+                avg_gain += gain / period
+                avg_loss += loss / period
+            else:
+                avg_gain += (gain - avg_gain) / period
+                avg_loss += (loss - avg_loss) / period
+            if i >= period:
+                if avg_loss > 0.0:
+                    rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+                else:
+                    rsi = 100.0 if avg_gain > 0.0 else np.nan
+        
+        # True range and directional movement (the first bar has no predecessor)
+        if i == 0:
+            tr = high[0] - low[0]
+            plus_dm = minus_dm = 0.0
+        else:
+            prev_close = close[i - 1]
+            tr = max(high[i] - low[i], abs(high[i] - prev_close), abs(low[i] - prev_close))
+            up_move = high[i] - high[i - 1]
+            down_move = low[i - 1] - low[i]
+            plus_dm = up_move if (up_move > down_move and up_move > 0.0) else 0.0
+            minus_dm = down_move if (down_move > up_move and down_move > 0.0) else 0.0
+        
+        # Wilder-smoothed ATR and +/-DM, seeded over bars 0..period-1
+        if i < period:
+            atr += tr / period
+            plus_dm_avg += plus_dm / period
+            minus_dm_avg += minus_dm / period
+        else:
+            atr += (tr - atr) / period
+            plus_dm_avg += (plus_dm - plus_dm_avg) / period
+            minus_dm_avg += (minus_dm - minus_dm_avg) / period
+        
+        # DX from bar period-1, ADX seeded over the first `period` DX values
+        if i >= period - 1:
+            dx = np.nan
+            if atr > 0.0:
+                plus_di = 100.0 * plus_dm_avg / atr
+                minus_di = 100.0 * minus_dm_avg / atr
+                if plus_di + minus_di > 0.0:
+                    dx = 100.0 * abs(plus_di - minus_di) / (plus_di + minus_di)
+            if i < 2 * period - 1:
+                adx += dx / period
+            elif not math.isnan(adx):
+                # Skip undefined DX (flat window) the way the pandas ewm in wilder_smooth does:
+                # the gap only decays the old value's weight, it does not poison the average
+                adx_weight *= 1.0 - 1.0 / period
+                if not math.isnan(dx):
+                    adx = (adx_weight * adx + dx / period) / (adx_weight + 1.0 / period)
+                    adx_weight = 1.0
+            elif not math.isnan(dx):
+                # NaN seed: like ewm, restart from the first defined DX
+                adx = dx
+    
+    # SMAs only need the trailing window, and only when the history covers it
+    last = close[n - 1]
+    sma20 = close[n - 20:].mean() if n >= 20 else np.nan
+    sma50 = close[n - 50:].mean() if n >= 50 else np.nan
+    sma200 = close[n - 200:].mean() if n >= 200 else np.nan
+    if n < period + 1:
+        rsi = np.nan
+    if n < period:
+        atr = np.nan
+    if n < 2 * period - 1:
+        adx = np.nan
+    macd = ema_fast - ema_slow
+    
+    lookback = min(252, n)
+    if lookback < 20:
+        percentile = 50.0
+    else:
+        below = 0
+        for i in range(n - lookback, n):
+            if close[i] < last:
+                below += 1
+        percentile = below / lookback * 100
+    
+    return (sma20, sma50, sma200, ema20, ema50, ema200, rsi, macd, macd_signal,
+            macd - macd_signal, adx, atr, percentile)
+
+
+if NUMBA_AVAILABLE:
+    # Compile at import so gunicorn --preload pays the JIT cost once, before forking workers
+    _warmup_close = np.linspace(100.0, 110.0, 64)
+    _indicators_last(_warmup_close, _warmup_close + 1.0, _warmup_close - 1.0)
+
+
+def _value_or(value: float, fallback: Any) -> Any:
+    """Return `value` as a Python float, or `fallback` when it is NaN"""
+    return fallback if math.isnan(value) else float(value)
+
+
+def ema_last(values: np.ndarray, spans) -> np.ndarray:
+    """
+    Final value of an adjust=False EMA for each span, in one pass over `values`.
+    
+    The recursion unrolls to ema = (1-a)^(n-1) * x[0] + sum_{i>=1} a * (1-a)^(n-1-i) * x[i],
+    so every span's weights go in one matrix and a single product replaces a full EWM per span.
+    """
+    alphas = 2.0 / (np.asarray(spans, dtype=np.float64) + 1.0)
+    decay = (1.0 - alphas)[:, None] ** np.arange(len(values) - 1, -1, -1)
+    weights = alphas[:, None] * decay
+    weights[:, 0] = decay[:, 0]
+    return weights @ values
+
+
+def wilder_smooth(values: np.ndarray, period: int) -> np.ndarray:
+    """Wilder's moving average (RMA): seeded with the SMA of the first `period` values,
+    then s[i] = s[i-1] + (x[i] - s[i-1]) / period. Leading positions are NaN.
+    """
+    out = np.full(len(values), np.nan)
+    if len(values) < period:
+        return out
+    seeded = values[period - 1:].copy()
+    seeded[0] = values[:period].mean()
+    # The recursion is an adjust=False EWM with alpha = 1/period, which pandas runs in C
+    out[period - 1:] = pd.Series(seeded).ewm(alpha=1 / period, adjust=False).mean().to_numpy()
+    return out
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """True Range per bar; the first bar has no previous close and uses high - low"""
+    prev_close = np.empty_like(close)
+    prev_close[0] = close[0]
+    prev_close[1:] = close[:-1]
+    
+    # max(high - low, |high - prev_close|, |low - prev_close|) with one scratch buffer
+    tr = np.subtract(high, low)
+    gap = np.subtract(high, prev_close)
+    np.maximum(tr, np.abs(gap, out=gap), out=tr)
+    np.subtract(low, prev_close, out=gap)
+    np.maximum(tr, np.abs(gap, out=gap), out=tr)
+    tr[0] = high[0] - low[0]
+    return tr
+
+
+def calculate_rsi(prices: np.ndarray, period: int = 14) -> np.ndarray:
+    """Calculate Relative Strength Index (Wilder-smoothed gains/losses)"""
+    delta = np.diff(prices)
+    rsi = np.full(len(prices), np.nan)
+    
+    avg_gain = wilder_smooth(np.maximum(delta, 0.0), period)
+    avg_loss = wilder_smooth(np.maximum(-delta, 0.0), period)
     
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        rsi[1:] = 100 - (100 / (1 + rs))
     
     return rsi
 
 
-def calculate_macd(prices: pd.Series, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[pd.Series, pd.Series, pd.Series]:
-    """Calculate MACD indicator"""
-    ema_fast = prices.ewm(span=fast, adjust=False).mean()
-    ema_slow = prices.ewm(span=slow, adjust=False).mean()
+def calculate_macd(prices: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[float, float, float]:
+    """Calculate the latest MACD line, signal line and histogram values"""
+    series = pd.Series(prices)
+    ema_fast = series.ewm(span=fast, adjust=False).mean().to_numpy()
+    ema_slow = series.ewm(span=slow, adjust=False).mean().to_numpy()
     
+    # The signal EMA needs the whole MACD series, but only its final value is reported
     macd_line = ema_fast - ema_slow
-    signal_line = macd_line.ewm(span=signal, adjust=False).mean()
-    histogram = macd_line - signal_line
+    signal_line = float(ema_last(macd_line, (signal,))[0])
+    histogram = float(macd_line[-1]) - signal_line
     
-    return macd_line, signal_line, histogram
+    return float(macd_line[-1]), signal_line, histogram
 
 
-def calculate_adx(high: pd.Series, low: pd.Series, close: pd.Series, period: int = 14) -> pd.Series:
-    """Calculate Average Directional Index (trend strength)"""
+def calculate_adx(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14,
+                  atr: Optional[np.ndarray] = None) -> np.ndarray:
+    """Calculate Average Directional Index (trend strength); pass `atr` if already computed"""
     
-    # Calculate True Range
-    tr1 = high - low
-    tr2 = abs(high - close.shift())
-    tr3 = abs(low - close.shift())
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+    # Wilder-smoothed True Range
+    if atr is None:
+        atr = calculate_atr(high, low, close, period)
     
     # Calculate Directional Movement
-    up_move = high - high.shift()
-    down_move = low.shift() - low
+    up_move = np.diff(high, prepend=high[0])
+    down_move = -np.diff(low, prepend=low[0])
     
-    plus_dm = up_move.where((up_move > down_move) & (up_move > 0), 0)
-    minus_dm = down_move.where((down_move > up_move) & (down_move > 0), 0)
+    plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+    minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
     
     # Smooth with Wilder's method
-    atr = tr.rolling(window=period).mean()
-    plus_di = 100 * (plus_dm.rolling(window=period).mean() / atr)
-    minus_di = 100 * (minus_dm.rolling(window=period).mean() / atr)
-    
-    # Calculate DX and ADX
-    dx = 100 * abs(plus_di - minus_di) / (plus_di + minus_di)
-    adx = dx.rolling(window=period).mean()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = 100 * (wilder_smooth(plus_dm, period) / atr)
+        minus_di = 100 * (wilder_smooth(minus_dm, period) / atr)
+        
+        # Calculate DX and ADX (DX is defined from bar period-1 onwards)
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    adx = np.full(len(dx), np.nan)
+    adx[period - 1:] = wilder_smooth(dx[period - 1:], period)
     
     return adx
 
 
-def calculate_atr(high: pd.Series, low: pd.Series, close: pd.Series, period: int = 14) -> pd.Series:
-    """Calculate Average True Range (volatility)"""
-    tr1 = high - low
-    tr2 = abs(high - close.shift())
-    tr3 = abs(low - close.shift())
-    
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    atr = tr.rolling(window=period).mean()
-    
-    return atr
+def calculate_atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """Calculate Average True Range (volatility), Wilder-smoothed"""
+    return wilder_smooth(true_range(high, low, close), period)
 
 
-def calculate_52w_percentile(prices: pd.Series) -> float:
+def calculate_52w_percentile(prices: np.ndarray) -> float:
     """Calculate current price percentile over 52 weeks"""
     period = min(252, len(prices))  # 252 trading days ~= 1 year
     
     if period < 20:
         return 50.0  # Not enough data
     
-    recent_prices = prices.iloc[-period:]
-    current_price = prices.iloc[-1]
+    recent_prices = prices[-period:]
+    current_price = recent_prices[-1]
     
-    percentile = (recent_prices < current_price).sum() / len(recent_prices) * 100
+    percentile = np.count_nonzero(recent_prices < current_price) / period * 100
     
     return float(percentile)
 
 
-def detect_market_regime(df: pd.DataFrame, indicators: Dict[str, Any]) -> Dict[str, Any]:
+def detect_market_regime(close: np.ndarray, indicators: Dict[str, Any]) -> Dict[str, Any]:
     """Detect market regime (trending vs mean-reverting)"""
     
     adx_value = indicators['adx']['value']
     rsi_value = indicators['rsi']['value']
     
-    # Get price action
-    close = df['Close']
-    returns = close.pct_change().dropna()
-    
-    # Calculate volatility
-    volatility = returns.rolling(window=20).std() * np.sqrt(252)
-    current_vol = float(volatility.iloc[-1]) if not pd.isna(volatility.iloc[-1]) else 0.20
+    # Get price action over the latest 20 returns
+    tail = close[-21:]
+    tail = tail[1:] / tail[:-1] - 1
     
-    # Calculate autocorrelation (mean reversion indicator)
-    autocorr = returns.rolling(window=20).apply(lambda x: x.autocorr(), raw=False).iloc[-1]
-    autocorr = float(autocorr) if not pd.isna(autocorr) else 0.0
+    # Annualized volatility and lag-1 autocorrelation (mean reversion indicator)
+    # of the latest 20-bar window only; defaults when there is less history
+    current_vol = 0.20
+    autocorr = 0.0
+    if tail.size == 20:
+        current_vol = _value_or(tail.std(ddof=1) * np.sqrt(252), current_vol)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            autocorr = _value_or(np.corrcoef(tail[:-1], tail[1:])[0, 1], autocorr)
     
     # Determine regime
     if adx_value > 25:
@@ -483,7 +1061,7 @@ def detect_market_regime(df: pd.DataFrame, indicators: Dict[str, Any]) -> Dict[s
     # Determine trend direction
     sma_20 = indicators['moving_averages']['sma_20']
     sma_50 = indicators['moving_averages']['sma_50']
-    current_price = float(close.iloc[-1])
+    current_price = float(close[-1])
     
     if sma_20 and sma_50:
         if sma_20 > sma_50 and current_price > sma_20:
@@ -506,17 +1084,8 @@ def detect_market_regime(df: pd.DataFrame, indicators: Dict[str, Any]) -> Dict[s
     }
 
 
-def calculate_support_resistance(df: pd.DataFrame, lookback: int = 20) -> List[Dict[str, float]]:
-    """Calculate support and resistance levels using pivot points"""
-    
-    high = df['High']
-    low = df['Low']
-    close = df['Close']
-    
-    # Get recent highs and lows
-    recent_high = float(high.iloc[-lookback:].max())
-    recent_low = float(low.iloc[-lookback:].min())
-    current_price = float(close.iloc[-1])
+def calculate_support_resistance(recent_high: float, recent_low: float, current_price: float) -> List[Dict[str, float]]:
+    """Calculate support and resistance levels using pivot points over the recent high/low"""
     
     # Classic pivot points
     pivot = (recent_high + recent_low + current_price) / 3
@@ -529,48 +1098,36 @@ def calculate_support_resistance(df: pd.DataFrame, lookback: int = 20) -> List[D
     support2 = pivot - (recent_high - recent_low)
     support3 = recent_low - 2 * (recent_high - pivot)
     
+    # Ordered top to bottom to match PIVOT_LEVEL_TYPES / PIVOT_LEVEL_STRENGTHS
+    prices = np.array([resistance3, resistance2, resistance1, pivot, support1, support2, support3])
+    distance_pct = ((prices - current_price) / current_price) * 100
+    
     levels = [
-        {'type': 'resistance', 'level': resistance3, 'strength': 'strong', 'distance_pct': ((resistance3 - current_price) / current_price) * 100},
-        {'type': 'resistance', 'level': resistance2, 'strength': 'moderate', 'distance_pct': ((resistance2 - current_price) / current_price) * 100},
-        {'type': 'resistance', 'level': resistance1, 'strength': 'weak', 'distance_pct': ((resistance1 - current_price) / current_price) * 100},
-        {'type': 'pivot', 'level': pivot, 'strength': 'neutral', 'distance_pct': ((pivot - current_price) / current_price) * 100},
-        {'type': 'support', 'level': support1, 'strength': 'weak', 'distance_pct': ((support1 - current_price) / current_price) * 100},
-        {'type': 'support', 'level': support2, 'strength': 'moderate', 'distance_pct': ((support2 - current_price) / current_price) * 100},
-        {'type': 'support', 'level': support3, 'strength': 'strong', 'distance_pct': ((support3 - current_price) / current_price) * 100},
+        {'type': level_type, 'level': level, 'strength': strength, 'distance_pct': distance}
+        for level_type, level, strength, distance in zip(
+            PIVOT_LEVEL_TYPES, prices.tolist(), PIVOT_LEVEL_STRENGTHS, distance_pct.tolist()
+        )
     ]
     
     return levels
 
 
-def calculate_fibonacci_levels(df: pd.DataFrame, lookback: int = 50) -> Dict[str, Any]:
-    """Calculate Fibonacci retracement levels"""
-    
-    high = df['High']
-    low = df['Low']
-    close = df['Close']
-    
-    # Find swing high and low
-    swing_high = float(high.iloc[-lookback:].max())
-    swing_low = float(low.iloc[-lookback:].min())
-    current_price = float(close.iloc[-1])
+def calculate_fibonacci_levels(swing_high: float, swing_low: float, current_price: float) -> Dict[str, Any]:
+    """Calculate Fibonacci retracement levels between the swing high and low"""
     
     diff = swing_high - swing_low
     
-    # Fibonacci retracement levels
+    # Fibonacci retracement levels; the 0% and 100% ends are the swing points themselves
+    retracements = {'0.0': swing_high}
+    retracements.update(zip(FIBONACCI_LABELS, (swing_high - FIBONACCI_RATIOS * diff).tolist()))
+    retracements['100.0'] = swing_low
+    
     levels = {
         'swing_high': swing_high,
         'swing_low': swing_low,
         'current_price': current_price,
-        'retracements': {
-            '0.0': swing_high,
-            '23.6': swing_high - 0.236 * diff,
-            '38.2': swing_high - 0.382 * diff,
-            '50.0': swing_high - 0.500 * diff,
-            '61.8': swing_high - 0.618 * diff,
-            '78.6': swing_high - 0.786 * diff,
-            '100.0': swing_low
-        },
-        'trend': 'downtrend' if current_price < (swing_high - 0.5 * diff) else 'uptrend'
+        'retracements': retracements,
+        'trend': 'downtrend' if current_price < retracements['50.0'] else 'uptrend'
     }
     
     return levels
@@ -579,43 +1136,40 @@ def calculate_fibonacci_levels(df: pd.DataFrame, lookback: int = 50) -> Dict[str
 def determine_bias(indicators: Dict[str, Any], regime: Dict[str, Any]) -> Tuple[str, float]:
     """Determine overall bias and confidence"""
     
-    signals = []
+    # Signal weights accumulated per direction
+    bullish_weight = bearish_weight = neutral_weight = 0.0
     
     # Moving average signals
     ma = indicators['moving_averages']
     if ma['sma_20'] and ma['sma_50']:
         if ma['sma_20'] > ma['sma_50']:
-            signals.append(('bullish', 0.3))
+            bullish_weight += 0.3
         else:
-            signals.append(('bearish', 0.3))
+            bearish_weight += 0.3
     
     # RSI signal
     rsi_val = indicators['rsi']['value']
     if rsi_val > 70:
-        signals.append(('bearish', 0.2))  # Overbought
+        bearish_weight += 0.2  # Overbought
     elif rsi_val < 30:
-        signals.append(('bullish', 0.2))  # Oversold
+        bullish_weight += 0.2  # Oversold
     elif 40 <= rsi_val <= 60:
-        signals.append(('neutral', 0.2))
+        neutral_weight += 0.2
     
     # MACD signal
     macd_signal = indicators['macd']['signal']
     if macd_signal == 'bullish':
-        signals.append(('bullish', 0.3))
+        bullish_weight += 0.3
     elif macd_signal == 'bearish':
-        signals.append(('bearish', 0.3))
+        bearish_weight += 0.3
     
     # Regime signal
     if regime['direction'] == 'uptrend':
-        signals.append(('bullish', 0.2))
+        bullish_weight += 0.2
     elif regime['direction'] == 'downtrend':
-        signals.append(('bearish', 0.2))
+        bearish_weight += 0.2
     
     # Calculate weighted bias
-    bullish_weight = sum(weight for signal, weight in signals if signal == 'bullish')
-    bearish_weight = sum(weight for signal, weight in signals if signal == 'bearish')
-    neutral_weight = sum(weight for signal, weight in signals if signal == 'neutral')
-    
     total_weight = bullish_weight + bearish_weight + neutral_weight
     
     if total_weight == 0:
@@ -694,27 +1248,30 @@ def interpret_adx(adx: float) -> str:
 
 
 def get_mock_ohlcv(ticker: str) -> pd.DataFrame:
-    """Generate mock OHLCV data for testing"""
-    dates = pd.date_range(end=datetime.now(), periods=252, freq='D')
-    
-    # Simple random walk with drift
-    np.random.seed(hash(ticker) % (2**32))
-    returns = np.random.normal(0.001, 0.02, 252)
+    """Generate mock OHLCV data for testing (positional index; nothing reads the bar dates)"""
+    # Simple random walk with drift; a per-ticker generator keeps the global NumPy RNG untouched.
+    # crc32 (unlike the per-process salted hash()) gives every gunicorn worker the same series.
+    rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+    returns = rng.normal(0.001, 0.02, 252)
     prices = 100 * np.exp(np.cumsum(returns))
     
+    # One uniform draw for the open/high/low offsets and volume, scaled per column
+    noise = rng.random((252, 4))
+    
     df = pd.DataFrame({
-        'Open': prices * (1 + np.random.uniform(-0.01, 0.01, 252)),
-        'High': prices * (1 + np.random.uniform(0, 0.02, 252)),
-        'Low': prices * (1 - np.random.uniform(0, 0.02, 252)),
+        'Open': prices * (1 + (noise[:, 0] * 0.02 - 0.01)),
+        'High': prices * (1 + noise[:, 1] * 0.02),
+        'Low': prices * (1 - noise[:, 2] * 0.02),
         'Close': prices,
-        'Volume': np.random.uniform(1e6, 10e6, 252)
-    }, index=dates)
+        'Volume': 1e6 + noise[:, 3] * 9e6
+    }, index=pd.RangeIndex(252))
     
     return df
 
 
 if __name__ == '__main__':
-    import os
+    # Local development only: containers serve main:app through gunicorn (see Dockerfile).
+    # Set FLASK_DEBUG=1 for the reloader/debugger.
     port = int(os.environ.get('PORT', 8087))
-    app.run(host='0.0.0.0', port=port, debug=True)
+    app.run(host='0.0.0.0', port=port, debug=bool(os.environ.get('FLASK_DEBUG')))
 